@@ -0,0 +1,164 @@
+import argparse
+import json
+import platform
+import statistics
+import time
+import numpy as np
+from charles import Population, check_macros
+from problem import Problem
+from selection import fps, tournament, ranking, batch_fps, batch_tournament, batch_ranking
+from crossover import single_point_co, multi_point_co, uniform_co, batch_single_point_co, batch_multi_point_co, batch_uniform_co
+from mutation import swap_mutation, inversion_mutation, random_mutation, batch_swap_mutation, batch_inversion_mutation, batch_random_mutation
+
+# This benchmark measures the time of each operator (selection, crossover and mutation, in their pairwise and batched versions), of the evaluation of the
+# fitness and feasibility of the diet plans, and of complete runs of evolve, for several population sizes and genome widths (the 77 foods of the Stigler's
+# diet problem, and synthetic problems with more foods). Every case starts from a fixed seed, so the populations (and the work done) are the same in every
+# run of the benchmark, and the results are saved as JSON, so they can be compared between versions of the code to find throughput regressions.
+# Example: python benchmark.py --sizes 70 1000 --widths 77 --output before.json
+
+selections = [fps, tournament, ranking, batch_fps, batch_tournament, batch_ranking]
+crossovers = [single_point_co, multi_point_co, uniform_co, batch_single_point_co, batch_multi_point_co, batch_uniform_co]
+mutations = [swap_mutation, inversion_mutation, random_mutation, batch_swap_mutation, batch_inversion_mutation, batch_random_mutation]
+
+# Methods used in the end-to-end runs of evolve: the pairwise (reference) operators, the batched ones, and the batched ones with the (mu + lambda) schedule
+evolve_configs = {
+    'pairwise': {'select': tournament, 'crossover': uniform_co, 'mutate': random_mutation},
+    'batched': {'select': batch_tournament, 'crossover': batch_uniform_co, 'mutate': batch_random_mutation},
+    'batched_mu_plus_lambda': {'select': batch_tournament, 'crossover': batch_uniform_co, 'mutate': batch_random_mutation, 'schedule': "mu_plus_lambda"},
+}
+
+# Define a function that returns a synthetic diet problem with num_foods foods. Each food is a copy of a random food of the Stigler's diet problem, with its price
+# (and the amounts of nutrients it gives) multiplied by a random factor, so the nutrients per dollar have the same distribution and the targets are the same.
+def synthetic_problem(num_foods, seed=0):
+    default = Problem.default()
+    if num_foods == default.num_genes:
+        return default
+
+    rng = np.random.default_rng(seed)
+    foods = rng.integers(0, default.num_genes, num_foods)
+    factors = rng.uniform(0.5, 1.5, num_foods)
+    return Problem(default.prices[foods] * factors, default.nutrient_matrix[foods] * factors[:, np.newaxis], default.targets,
+                   nutrient_names=default.nutrient_names)
+
+# Define a function that calls function (without arguments) repeat times, after calling setup (if it is given) before each call, and returns the statistics of
+# the times of the calls, in seconds
+def time_call(function, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return {'min': min(times), 'median': statistics.median(times), 'mean': statistics.mean(times), 'repeat': repeat}
+
+# Define a function that returns a function that draws the 2 * size parents of a generation with the selection method select
+def selection_case(population, select, rng):
+    n = 2 * population.size
+
+    def draw():
+        # The tables of the selection methods are built once per generation, so they are built again in each call
+        population.selection_tables = {}
+        if getattr(select, "batched", False):
+            select(population, n, rng=rng)
+        else:
+            for _ in range(n):
+                select(population, rng=rng)
+
+    return draw
+
+# Define a function that returns a function that applies the crossover to size // 2 pairs of parents of the population
+def crossover_case(population, crossover, rng):
+    genomes = population.get_genomes()
+    parents1, parents2 = genomes[0::2][:population.size // 2], genomes[1::2][:population.size // 2]
+    if getattr(crossover, "batched", False):
+        return lambda: crossover(parents1, parents2, rng=rng)
+    pairs = list(zip(parents1.tolist(), parents2.tolist()))
+    return lambda: [crossover(p1, p2, rng=rng) for p1, p2 in pairs]
+
+# Define a function that returns a function that applies the mutation to all individuals of the population
+def mutation_case(population, mutate, rng):
+    genomes = population.get_genomes()
+    if getattr(mutate, "batched", False):
+        buffer = np.empty_like(genomes)
+        return lambda: mutate(genomes, out=buffer, rng=rng)
+    representations = genomes.tolist()
+    return lambda: [mutate(representation, rng=rng) for representation in representations]
+
+# Define a function that runs all cases of the benchmark for the population sizes and genome widths given, and returns a list with their results
+def run_benchmarks(sizes, widths, repeat=3, gens=5, seed=0, only=None):
+    results = []
+
+    def record(group, name, size, width, function, items, setup=None):
+        case = f"{group}/{name}/{size}x{width}"
+        if only is not None and not any(pattern in case for pattern in only):
+            return
+        stats = time_call(function, repeat, setup)
+        # Throughput: number of items (individuals, pairs, parents or generations) processed per second
+        stats['items'] = items
+        stats['items_per_second'] = items / stats['min'] if stats['min'] > 0 else None
+        results.append({'case': case, 'group': group, 'name': name, 'size': size, 'width': width, **stats})
+        print(f"{case:<55} min {stats['min'] * 1000:10.3f} ms   median {stats['median'] * 1000:10.3f} ms")
+
+    for width in widths:
+        problem = synthetic_problem(width, seed)
+        for size in sizes:
+            record("init", "Population", size, width, lambda: Population(size=size, optim="min", problem=problem, valid_set=[0.1, 1], rng=seed), size)
+
+            population = Population(size=size, optim="min", problem=problem, valid_set=[0.1, 1], rng=seed)
+            genomes = population.get_genomes()
+
+            # Fitness and feasibility of all individuals: batched (a matrix product), and one individual at a time (the reference)
+            record("evaluate", "Population.evaluate", size, width, lambda: population.evaluate(genomes), size)
+            representations = genomes.tolist()
+            record("evaluate", "check_macros", size, width, lambda: [check_macros(representation, problem) for representation in representations], size)
+
+            # Each operator draws its random numbers from a new generator with the same seed
+            for select in selections:
+                record("selection", select.__name__, size, width, selection_case(population, select, np.random.default_rng(seed)), 2 * size)
+            for crossover in crossovers:
+                record("crossover", crossover.__name__, size, width, crossover_case(population, crossover, np.random.default_rng(seed)), size // 2)
+            for mutate in mutations:
+                record("mutation", mutate.__name__, size, width, mutation_case(population, mutate, np.random.default_rng(seed)), size)
+
+            # Complete runs of evolve, each one starting from a new copy of the same population
+            for name, methods in evolve_configs.items():
+                run = {}
+
+                def setup():
+                    run['population'] = Population(size=size, optim="min", problem=problem, valid_set=[0.1, 1], rng=seed)
+
+                def evolve():
+                    run['population'].evolve(gens=gens, replacement=False, xo_p=0.9, mut_p=0.2, elitism=True, fitness_sharing=False, callbacks=[], **methods)
+
+                record("evolve", name, size, width, evolve, gens, setup)
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the operators and the evolution of the Genetic Algorithm for the Stigler's diet problem.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[70, 1000, 10000], help="population sizes")
+    parser.add_argument("--widths", type=int, nargs="+", default=[77, 1000], help="number of foods (77 is the Stigler's diet problem, other widths are synthetic problems)")
+    parser.add_argument("--repeat", type=int, default=3, help="number of times each case is timed (the minimum time is the most stable)")
+    parser.add_argument("--gens", type=int, default=5, help="number of generations of the runs of evolve")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the populations and operators")
+    parser.add_argument("--only", nargs="+", default=None, help="only run the cases whose name (group/name/sizexwidth) contains one of these strings")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file where the results are saved")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.widths, repeat=args.repeat, gens=args.gens, seed=args.seed, only=args.only)
+
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'settings': {'sizes': args.sizes, 'widths': args.widths, 'repeat': args.repeat, 'gens': args.gens, 'seed': args.seed},
+        'results': results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"---> Saved {len(results)} results in {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from collections import OrderedDict
+import numpy as np
+
+# Many of the genomes evaluated by the Genetic Algorithm were already evaluated before: the elite, the offsprings that are copies of their parents, swaps and
+# inversions of genes that are both zero, crossovers between near-identical parents, etc. An EvaluationCache saves the price (fitness) and the amounts of the
+# nutrients of the genomes evaluated, so they are not calculated again. The genomes are identified by their values rounded to decimals decimal places, and the
+# cache keeps at most maxsize genomes, discarding the least recently used ones. It counts how many evaluations were found in the cache (hits) and how many
+# had to be calculated (misses). The same cache can be shared by several problems: the key of each genome starts with the key of the problem that evaluates it
+# (a digest of its prices, nutrient matrix and targets, see Problem.key), so a genome evaluated for one problem is never returned for another one.
+class EvaluationCache:
+    def __init__(self, maxsize=100000, decimals=9):
+        self.maxsize = maxsize
+        self.scale = 10.0 ** decimals
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # Define a function that returns the keys of the genomes given (the rows of a matrix): the key of the problem followed by the bytes of their values, rounded
+    # and converted to integers
+    def keys(self, genomes, problem_key=b""):
+        quantized = np.round(np.asarray(genomes, dtype=np.float64) * self.scale).astype(np.int64)
+        return [problem_key + row.tobytes() for row in quantized]
+
+    # Define a function that evaluates the genomes given, returning the fitness and the amounts of the nutrients (a matrix with width columns) of each one.
+    # The genomes that are not in the cache are evaluated all at once by the function compute, that receives a matrix of genomes and returns their fitness
+    # and amounts of nutrients, and are added to the cache. problem_key identifies the problem that evaluates the genomes.
+    def evaluate(self, genomes, compute, width, problem_key=b""):
+        genomes = np.asarray(genomes, dtype=np.float64)
+        keys = self.keys(genomes, problem_key)
+        fitness = np.empty(len(genomes))
+        totals = np.empty((len(genomes), width))
+
+        missing = []
+        for i, key in enumerate(keys):
+            entry = self.entries.get(key)
+            if entry is None:
+                missing.append(i)
+            else:
+                self.entries.move_to_end(key)
+                fitness[i], totals[i] = entry
+        self.hits += len(genomes) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            fitness[missing], totals[missing] = compute(genomes[missing])
+            for i in missing:
+                self.entries[keys[i]] = (fitness[i], totals[i].copy())
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+        return fitness, totals
+
+    # Define a function that returns the fraction of evaluations that were found in the cache
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate(), 'size': len(self.entries)}
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,74 +1,92 @@
-import random
-from copy import deepcopy
-from operator import attrgetter
-from sdp_data import foods, target_macros
+import numpy as np
 import math
+from sharing import exact_sharing
+from problem import Problem
+from instrumentation import Instrumentation, print_best
+from lp import lp_seeds as make_lp_seeds, optimality_gap
+from generators import get_rng
+from checkpoint import save_checkpoint, load_checkpoint
+
+# Define a function that calculates the amounts of each nutrient present in a diet plan and verifies if the target_macros are being satisfied.
+# The amount of a nutrient in the diet plan is the sum, over all foods, of the factor of the food multiplied by the amount of the nutrient given by one unit
+# of that food, which is a single dot product with the nutrient matrix of the problem (by default, the Stigler's diet problem, with the data of sdp_data).
+def check_macros(representation, problem=None):
+    if problem is None:
+        problem = Problem.default()
+    return problem.check(representation)
+
+# Define a function that generates n random representations at once, as the rows of a (n x size) matrix, with the random numbers of the Generator rng.
+def random_representations(n, size, valid_set, rng=None):
+    rng = get_rng(rng)
+    # Define a list of probabilities, where the first element will be the probability of having 0 in the representation, and the other
+    # will be the probability of generating a random number between 0.1 and 1 (specified in the valid_set list, that is initialized in the sdp file).
+    # Below you can see this implemented. We chose to have a valid_set between 0.1 and 1 because we didn't want to include the probability of
+    # generating a zero twice.
+    probabilities = [0.7, 0.3]
+
+    # Each gene is nonzero with the probability probabilities[1], and in that case its value is a number between valid_set[0] and valid_set[1], rounded to 1 decimal
+    nonzero = rng.random((n, size)) < probabilities[1]
+    values = np.round(rng.uniform(valid_set[0], valid_set[1], (n, size)), 1)
+
+    return np.where(nonzero, values, 0.0)
 
 class Individual:
+    # Individuals only store their representation, fitness and position in the population, so we use __slots__ to make them lightweight.
+    # In the compact mode of the Population, the representation is a view over a row of the population's genome matrix, instead of a list.
+    __slots__ = ("representation", "fitness", "index", "problem")
+
     def __init__(
         self,
         representation= None,
         size=None,
         valid_set=[0,0],
+        fitness=None,
+        index=None,
+        repair=True,
+        problem=None,
+        rng=None,
     ):
-        # Define a list of probabilities, where the first element will be the probability of having 0 in the representation, and the other
-        # will be the probability of generating a random number between 0.1 and 1 (specified in the valid_set list, that is initialized in the sdp file).
-        # Below you can see this implemented. We chose to have a valid_set between 0.1 and 1 because we didn't want to include the probability of
-        # generating a zero twice.
-        probabilities = [0.7, 0.3]
-
-        # If our individual doesn't have a representation, we will generate one
-        if representation == None:
+        # Position of the individual in its population (None if it doesn't belong to a population)
+        self.index = index
+        # Problem that defines the price of the diet plan and the macros to satisfy (by default, the Stigler's diet problem)
+        self.problem = problem if problem is not None else Problem.default()
+
+        # If our individual doesn't have a representation, we will generate one. If repair is True and the representation doesn't satisfy the macros, it is repaired
+        # (see repair.py), so this takes a bounded time. The random numbers are drawn from the Generator rng (see generators.py).
+        rng = get_rng(rng)
+        if representation is None and repair:
+            self.representation = self.problem.clip(random_representations(1, size, valid_set, rng))[0].tolist()
+            if not self.verify_macros()[0]:
+                self.representation = self.problem.repair([self.representation])[0].tolist()
+        elif representation is None:
             while True:
-                self.representation = [round(random.choices([0, round(random.uniform(valid_set[0], valid_set[1]), 1)], probabilities)[0], 1) for _ in range(size)]
+                self.representation = self.problem.clip(random_representations(1, size, valid_set, rng))[0].tolist()
                 # Then, we check if the created individual satisfies the macros, i.e. the minimum daily recommended intake of the nutrients specified in the
-                # target_macros (in sdp_data).
+                # targets of the problem (by default, the target_macros in sdp_data).
                 # We keep generating representations, until the macros are satisfied.
                 if self.verify_macros()[0]:
                     break
         else:
             self.representation = representation
-        self.fitness = self.get_fitness()
+
+        # If the fitness was already calculated (for example, by Population.evaluate), we don't calculate it again
+        if fitness is None:
+            self.fitness = self.get_fitness()
+        else:
+            self.fitness = fitness
 
     # Define the fitness function, that will be the price of the diet plan.
     def get_fitness(self):
-        price = 0
-
         # For every food (corresponds to every position in the representation), multiply its quantity, that is given by the factor, that is the element i of the
-        # individual's representation, by the price of that food, and multiply it by 0.01, in order to get the price in dollars, since the price we are receiving is in cents.
-        # Sum the values obtained for each food, in order to get the overall diet's price.
-        for i, food in enumerate(foods.index):
-            factor = self.representation[i]
-            price += factor * foods.loc[food, 'price'] * 0.01
-
-        return price
+        # individual's representation, by the price of that food in dollars, and sum the values obtained, in order to get the overall diet's price.
+        # This is the dot product between the representation and the precomputed price vector of the problem (or a lookup in its cache, if it has one).
+        if self.problem.cache is not None:
+            return float(self.problem.fitness_and_totals([self.representation])[0][0])
+        return float(np.dot(self.representation, self.problem.prices))
 
     # Define a function that verifies if the target_macros are being satisfied.
     def verify_macros(self):
-        valid = True
-        # Initialize a dictionary that will contain the names of the nutrients and associated to them the amounts of each one present in the diet plan
-        nutrients = {}
-        for i, food in enumerate(foods.index):
-            factor = self.representation[i] # Corresponds to the amount of each food in one individual
-            for nutrient in target_macros.keys():
-                if nutrient not in nutrients: # If the nutrient isn't already in the dictionary, we add it and initialize its value to 0
-                    nutrients[nutrient] = 0
-                # If it already exists, we add to the value it already had the factor multiplied by the price by 0.01 by the amount of the nutrient.
-                # By doing so, we are getting the price of the foods for the specified amounts in dollars (as we calculated in the verify_macros()), and then
-                # we multiply it by the amount of nutrient, because the amounts of nutrients we have are corresponding to 1 dollar.
-                nutrients[nutrient] += factor * foods.loc[food]['price'] * 0.01 * foods.loc[food][nutrient]
-
-        # Now our nutrients dictionary contains the amounts of each nutrient for the current diet plan.
-        for nutrient in nutrients.keys():
-            # Finally, we do a if condition to check if the target_macros are being achieved
-            if nutrients[nutrient] < target_macros[nutrient]:
-                # If the amounts of nutrients we have are less than the target_macros, we return valid = False
-                valid = False
-                break
-
-        # print("Nutrients:", nutrients)
-
-        return valid, nutrients
+        return self.problem.check(self.representation)
 
     def get_representation(self):
         return self.representation
@@ -86,38 +104,136 @@ class Individual:
         return f"Individual(size={len(self.representation)}); Fitness: {self.fitness}; Representation: {self.representation}"
 
 class Population:
-    def __init__(self, size, optim, **kwargs):
-        self.individuals = []
+    def __init__(self, size, optim, compact=False, dtype=np.float64, repair=True, problem=None, cache=None, lp_seeds=0, lp_noise=0.2, rng=None, **kwargs):
+        # Generator from which all random numbers of the population (and of the operators used by evolve) are drawn (see generators.py). It can be given as a
+        # Generator, or as a seed (an int or a SeedSequence), so a population created with the same seed always evolves in the same way.
+        self.rng = get_rng(rng)
+        # Problem that defines the price of the diet plans and the macros to satisfy (by default, the Stigler's diet problem, with the data of sdp_data).
+        # Each Population can be given its own Problem, so several diet problems can be optimized in the same process.
+        self.problem = problem if problem is not None else Problem.default()
+        # If an EvaluationCache is given (see cache.py), the population (and its individuals) evaluate the genomes through it
+        if cache is not None:
+            self.problem = self.problem.variant(cache=cache)
         self.size = size
+        # Number of fitness evaluations done by the population, and why the last evolve stopped (and after how many generations)
+        self.evaluations = 0
+        self.stop_reason = None
+        self.generations = 0
         self.optim = optim
         self.best_sol = None
         self.best_sol_per_gen = []
         self.best_sol_macros = []
-        for _ in range(size):
-            self.individuals.append(
-                Individual(
-                    size=kwargs["sol_size"],
-                    valid_set=kwargs["valid_set"],
-                )
-            )
+        # True if the population was created from a checkpoint (see resume), so the next evolve continues the one that saved it
+        self.resumed = False
+
+        # If repair is True, the individuals (and offsprings) that don't satisfy the macros are repaired (see repair.py), instead of being generated again until
+        # they satisfy them. We count how many were repaired in total (repairs) and in each generation of the last evolve (repairs_per_gen).
+        self.repair = repair
+        self.repairs = 0
+        self.repairs_per_gen = []
+
+        # In the compact mode, instead of a list of instances of the class Individual, the population is stored as one contiguous (size x genes) matrix with the
+        # genomes of all individuals (with the type dtype, float64 or float32), plus a vector with their fitness values.
+        self.compact = compact
+        self.dtype = dtype
+        self._individuals = []
+        self._views = None
+        # Tables used by the selection methods, that are built once per generation (see selection.py)
+        self.selection_tables = {}
+
+        # Generate the random individuals in batches: all the missing individuals are generated at once, and only the ones that satisfy the macros are kept.
+        # We keep generating batches, until the population is complete. If repair is True, a single batch is generated and the individuals that don't satisfy
+        # the macros are repaired.
+        sol_size = kwargs.get("sol_size", self.problem.num_genes)
+        genomes = np.empty((0, sol_size))
+        fitnesses = np.empty(0)
+        # If lp_seeds is given, that number of individuals are the exact solution of the problem (see lp.py) and perturbations of it (with the noise lp_noise).
+        # The optimum is exactly on the targets, so it is scaled up by the same margin as the repairs, to still satisfy the macros after the rounding errors of the
+        # evaluation and of the type of the population. The perturbations that don't satisfy the macros are repaired, even if repair is False.
+        if lp_seeds > 0:
+            margin = max(1e-9, 4 * np.finfo(self.dtype).eps)
+            genomes = make_lp_seeds(self.problem, self.problem.lp()['x'] * (1 + margin), min(lp_seeds, size), lp_noise, self.rng).astype(self.dtype).astype(np.float64)
+            fitnesses, feasible = self.evaluate(genomes)
+            self.repair_infeasible(genomes, fitnesses, feasible)
+        # The random genomes are limited to the bounds of the amount of each food of the problem, before they are evaluated (and repaired)
+        if repair and len(genomes) < size:
+            candidates = self.problem.clip(random_representations(size - len(genomes), sol_size, kwargs["valid_set"], self.rng))
+            fitness, feasible = self.evaluate(candidates)
+            self.repair_infeasible(candidates, fitness, feasible)
+            genomes = np.concatenate([genomes, candidates])
+            fitnesses = np.concatenate([fitnesses, fitness])
+        while len(genomes) < size:
+            candidates = self.problem.clip(random_representations(size - len(genomes), sol_size, kwargs["valid_set"], self.rng))
+            fitness, feasible = self.evaluate(candidates)
+            genomes = np.concatenate([genomes, candidates[feasible]])
+            fitnesses = np.concatenate([fitnesses, fitness[feasible]])
+
+        self.set_population(genomes, fitnesses)
+
+    # In the compact mode, the individuals are lightweight instances of the class Individual, that are views over the rows of the genome matrix.
+    # They are only created when they are needed (for example, by the selection methods), and are kept until the population changes.
+    @property
+    def individuals(self):
+        if not self.compact:
+            return self._individuals
+        if self._views is None:
+            self._views = [Individual(representation=self.genomes[k], fitness=fit, index=k, problem=self.problem) for k, fit in enumerate(self.fitnesses.tolist())]
+        return self._views
+
+    @individuals.setter
+    def individuals(self, individuals):
+        self.set_population(np.array([i.get_representation() for i in individuals], dtype=np.float64), np.array([i.fitness for i in individuals], dtype=np.float64))
+
+    # Define a function that replaces the population by the genomes given (as the rows of a matrix) with the corresponding fitness values
+    def set_population(self, genomes, fitnesses):
+        self.selection_tables = {}
+        if self.compact:
+            self.genomes = np.ascontiguousarray(genomes, dtype=self.dtype)
+            self.fitnesses = np.asarray(fitnesses, dtype=np.float64)
+            self._views = None
+        else:
+            self._individuals = [Individual(representation=representation, fitness=fit, index=k, problem=self.problem) for k, (representation, fit) in enumerate(zip(np.asarray(genomes).tolist(), np.asarray(fitnesses).tolist()))]
+            # The fitness values are also kept as a vector, so they don't have to be gathered from the individuals every time they are needed
+            self.fitnesses = np.array(fitnesses, dtype=np.float64)
+
+    # Define a function that returns the genomes of all individuals as the rows of a matrix
+    def get_genomes(self):
+        if self.compact:
+            return self.genomes
+        return np.array([i.representation for i in self._individuals], dtype=np.float64)
+
+    # Define a function that returns the genomes of the individuals in the positions rows, as a new (float64) matrix
+    def get_rows(self, rows):
+        if self.compact:
+            return self.genomes[rows].astype(np.float64)
+        return np.array([self._individuals[k].representation for k in np.asarray(rows).tolist()], dtype=np.float64)
+
+    # Define a function that returns the fitness values of all individuals as a vector
+    def get_fitnesses(self):
+        return self.fitnesses
+
+    # Define a function that changes the fitness values of all individuals (used by Fitness Sharing), keeping their genomes
+    def set_fitnesses(self, fitnesses):
+        self.selection_tables = {}
+        if self.compact:
+            self.fitnesses = np.asarray(fitnesses, dtype=np.float64)
+            self._views = None
+        else:
+            self.fitnesses = np.array(fitnesses, dtype=np.float64)
+            for individual, fit in zip(self._individuals, self.fitnesses.tolist()):
+                individual.fitness = fit
 
     # Define again the verify_macros function to be applied to the individuals inside the Population class
     def verify_macros(self, representation):
-            valid = True
-            nutrients = {}
-            for i, food in enumerate(foods.index):
-                factor = representation[i]
-                for nutrient in target_macros.keys():
-                    if nutrient not in nutrients:
-                        nutrients[nutrient] = 0
-                    nutrients[nutrient] += factor * foods.loc[food]['price'] * 0.01 * foods.loc[food][nutrient]
-
-            for nutrient in nutrients.keys():
-                if nutrients[nutrient] < target_macros[nutrient]:
-                    valid = False
-                    break
+        return self.problem.check(representation)
 
-            return valid, nutrients
+    # Define a function that evaluates many representations at once. The representations are the rows of a (N x genes) matrix, and the function returns
+    # the fitness (price of the diet plan) of each one and a mask that tells which ones satisfy the target_macros.
+    def evaluate(self, representations):
+        fitness, feasible = self.problem.evaluate(representations)
+        self.evaluations += len(fitness)
+
+        return fitness, feasible
 
     # Define the euclidean_distance function to calculate the Euclidean distance between individuals, to implement Fitness Sharing
     def euclidean_distance(self, individual1, individual2):
@@ -143,128 +259,436 @@ class Population:
             normalized_distances = [(d - min_distance) / (max_distance - min_distance) for d in distances]
         return normalized_distances
 
-    def evolve(self, gens, replacement, select, crossover, mutate, xo_p, mut_p, elitism, fitness_sharing):
-        self.best_sol_per_gen = []
-        self.best_sol_macros = []
-        for i in range(gens):
-            # Create a list that will store the individuals belonging to the new population
-            new_pop = []
+    # Define a function that repairs, in place, the genomes (rows of the matrix genomes) that are not feasible, updating their fitness, and returns how many were repaired
+    def repair_infeasible(self, genomes, fitness, feasible):
+        rows = np.flatnonzero(~feasible)
+        if rows.size > 0:
+            # The margin covers the rounding errors of storing the repaired genomes with the type of the population (for example, float32 in the compact mode)
+            margin = max(1e-9, 4 * np.finfo(self.dtype).eps)
+            genomes[rows] = self.problem.repair(genomes[rows], margin)
+            fitness[rows] = self.evaluate(genomes[rows])[0]
+        self.repairs += rows.size
+
+        return rows.size
+
+    # Define a function that selects the parents of n_pairs pairs and returns 2 arrays with their positions in the population. If the selection is batched
+    # (see selection.py), all parents are selected with a single call, otherwise they are selected one by one.
+    def select_parents(self, select, n_pairs, replacement):
+        if getattr(select, "batched", False):
+            parents = select(self, 2 * n_pairs)
+            parents1, parents2 = parents[0::2].copy(), parents[1::2].copy()
+            # If replacement is False, we don't want to select the same individual for both parents. Thus, while there are pairs with the same parents,
+            # we select new individuals for their parent2
+            if replacement == False:
+                same = np.flatnonzero(parents1 == parents2)
+                while same.size > 0:
+                    parents2[same] = select(self, same.size)
+                    same = same[parents1[same] == parents2[same]]
+            return parents1, parents2
+
+        parents1, parents2 = np.empty(n_pairs, dtype=np.intp), np.empty(n_pairs, dtype=np.intp)
+        for k in range(n_pairs):
+            parent1, parent2 = select(self), select(self)
+            # If replacement is False, we don't want to select the same individual for both parents
+            if replacement == False:
+                # Thus, we do a while that, while the parents are the same, will select a new individual for parent2
+                while parent2.index == parent1.index:
+                    parent2 = select(self)
+            parents1[k] = parent1.index
+            parents2[k] = parent2.index
+
+        return parents1, parents2
+
+    # Define a function that applies the crossover to the pairs of parents given (as the rows of the matrices parents1 and parents2), with the probability of xo_p
+    # for each pair, and returns the matrices with the offsprings. If the crossover is batched (see crossover.py), all pairs are recombined with a single call,
+    # otherwise the crossover is applied pair by pair, which is the reference mode.
+    def apply_crossover(self, crossover, parents1, parents2, xo_p):
+        # If the random number generated for a pair is higher than the probability of doing crossover, this won't happen and the offsprings will be equal to the parents
+        offsprings1, offsprings2 = parents1.copy(), parents2.copy()
+        do_crossover = self.rng.random(len(parents1)) < xo_p
+
+        if getattr(crossover, "batched", False):
+            offsprings1[do_crossover], offsprings2[do_crossover] = crossover(parents1[do_crossover], parents2[do_crossover], rng=self.rng)
+        else:
+            for k in np.flatnonzero(do_crossover):
+                offsprings1[k], offsprings2[k] = crossover(parents1[k].tolist(), parents2[k].tolist(), rng=self.rng)
 
-            # If Elitism is applied, we will store a copy of the best individual inside the variable elite, depending on the type of problem
-            if elitism:
+        return offsprings1, offsprings2
+
+    # Define a function that applies the mutation to the offsprings given (as the rows of a matrix), with the probability of mut_p for each one, and returns
+    # the matrix with the mutated offsprings. If the mutation is batched (see mutation.py), all offsprings to be mutated are mutated with a single call, and written into the
+    # preallocated buffer (if it is given), otherwise the mutation is applied offspring by offspring. The matrix given is never changed.
+    def apply_mutation(self, mutate, offsprings, mut_p, buffer=None):
+        mutated = offsprings.copy()
+        rows = np.flatnonzero(self.rng.random(len(offsprings)) < mut_p)
+
+        if getattr(mutate, "batched", False):
+            out = buffer[:len(rows)] if buffer is not None else None
+            mutated[rows] = mutate(offsprings[rows], out=out, rng=self.rng)
+        else:
+            for k in rows:
+                mutated[k] = mutate(offsprings[k].tolist(), rng=self.rng)
+
+        return mutated
+
+    # The evolution runs for gens generations, unless a Termination (see termination.py) is given, which can stop it earlier (for example, when the best fitness
+    # stops improving). The reason why it stopped is saved in stop_reason, and get_stop_report returns a summary of the evolution.
+    # The time spent in each phase of each generation is recorded by an Instrumentation (see instrumentation.py), saved in self.instrumentation, and at the end
+    # of each generation the functions in callbacks are called with the population and the record of the generation (by default, print_best prints the best individual).
+    # If checkpoint is given, the state of the population is saved in that file every checkpoint_every generations, and at the end (see checkpoint.py). A population
+    # created with Population.resume from that file continues the evolution from the last generation saved, when evolve is called again with the same arguments.
+    # The schedule defines how the offsprings replace the population (replacement already means selecting the parents with or without replacement):
+    # - "generational": each generation creates size offsprings, that replace the whole population (with the elite, if elitism is True);
+    # - "steady_state": each generation (step) creates offspring_size offsprings (by default, 2), that replace the offspring_size worst individuals;
+    # - "mu_plus_lambda": each generation creates offspring_size offsprings (by default, size), and the best size individuals among the parents and the offsprings
+    #   survive.
+    # In the last two, the population is changed in place: only the rows of the individuals that are replaced are written, so the work and memory of each generation
+    # depend on offspring_size, instead of size. The best individual always survives, so elitism is not needed.
+    def evolve(self, gens, replacement, select, crossover, mutate, xo_p, mut_p, elitism, fitness_sharing, termination=None, callbacks=None, instrumentation=None,
+               checkpoint=None, checkpoint_every=1, schedule="generational", offspring_size=None):
+        if schedule == "generational":
+            offspring_size = self.size
+        elif schedule == "steady_state":
+            offspring_size = 2 if offspring_size is None else offspring_size
+            if not 1 <= offspring_size < self.size:
+                raise ValueError("The offspring_size of the steady_state schedule must be between 1 and the size of the population minus 1.")
+        elif schedule == "mu_plus_lambda":
+            offspring_size = self.size if offspring_size is None else offspring_size
+            if offspring_size < 1:
+                raise ValueError("The offspring_size of the mu_plus_lambda schedule must be at least 1.")
+            # Preallocate the vector with the fitness of the parents and the offsprings, from which the survivors are chosen
+            combined_fitness = np.empty(self.size + offspring_size)
+        else:
+            raise ValueError("The schedule must be generational, steady_state or mu_plus_lambda.")
+
+        if self.resumed:
+            # Continue from the generation after the last one saved (or don't run any generation, if the evolve that saved the checkpoint had finished)
+            first_gen = gens if self.finished else self.generations
+            self.resumed = False
+        else:
+            first_gen = 0
+            self.best_sol_per_gen = []
+            self.best_sol_macros = []
+            self.repairs_per_gen = []
+            self.stop_reason = "generations"
+            self.generations = 0
+        if termination is not None:
+            termination.start(self.evaluations)
+        if callbacks is None:
+            callbacks = [print_best]
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        timer = self.instrumentation
+        timer.start_profile()
+        for gen in range(first_gen, gens):
+            timer.start_generation(gen + 1, self)
+
+            # If Elitism is applied, we will store a copy of the best individual (its genome and fitness) inside the variable elite, depending on the type of problem
+            if elitism and schedule == "generational":
+                fitnesses = self.get_fitnesses()
                 if self.optim == "max":
-                    elite = deepcopy(max(self.individuals, key = attrgetter("fitness")))
+                    elite_index = int(np.argmax(fitnesses))
                 elif self.optim == "min":
-                    elite = deepcopy(min(self.individuals, key= attrgetter("fitness")))
+                    elite_index = int(np.argmin(fitnesses))
+                elite = (self.get_rows([elite_index])[0], fitnesses[elite_index])
+            timer.lap("elitism")
 
             ### Fitness Sharing
+            # The fitness of each individual is divided by its sharing coefficient, calculated from the distances between it and the other individuals.
+            # fitness_sharing can be True, that applies exact_sharing, or one of the functions of sharing.py (for example, sampled_sharing for large populations).
             if fitness_sharing:
-                for i in self.individuals:
-                    # Create an empty list that will store the distances between the individual i and all the others
-                    distances = []
-
-                    # Calculate the Euclidean distance between all individuals and save it in the distances list
-                    for j in self.individuals:
-                        if i != j: # Ensures that we are calculating the distances between 2 different individuals
-                            distance = self.euclidean_distance(i, j) # Using the euclidean_distance function, calculate the distance between the 2 individuals in question
-                            distances.append(distance) # and add this distance to the list distances
-
-                    # Normalize the distances between 0 and 1 using the normalize_distances function
-                    normalized_distances = self.normalize_distances(distances)
-
-                    # Calculate the Sharing Coefficient, that is the sum of all the distances normalized
-                    if normalized_distances == 1: # This is the case where the max_distance == min_distance, and so we will skip doing Fitness Sharing. Later the fitness of the individual will
-                        # be divided by the sharing_coefficient. Thus, since we are giving it the value of 1, its fitness will remain the same.
-                        sharing_coefficient = 1
-                    else:
-                        sharing_coefficient = sum(normalized_distances)
-                    # Finally, the fitness of the individual i is divided by the sharing_coefficient
-                    i.fitness = i.fitness / sharing_coefficient
-
-            # The next step is to populate the new population. Thus, while the size of new_pop is less than the size of the desired population, we will perform th enext steps
-            while len(new_pop) < self.size:
-                # Select, from the population we have, 2 individuals that will be the parents
-                parent1, parent2 = select(self), select(self)
-                # If replacement is False, we don't want to select the same individual for both parents
-                if replacement == False:
-                    # Thus, we do a while that, while the parents are the same, will select a new individual for parent2
-                    while parent2 == parent1:
-                        parent2 = select(self)
-
-                # Do a copy of both parents
-                parent1_ = deepcopy(parent1)
-                parent2_ = deepcopy(parent2)
-
-                # Initialize a counter to 0 that will count how many times the algorithm tries to create offsprings that do not reach the macros.
-                # If this counter gets to 20, the offsprings will simply become the same as their parents.
-                counter = 0
-                while True:
-                    # Crossover will happen with the probability of xo_p (and if the counter is less than 20)
-                    if random.random() < xo_p and counter < 20:
-                        offspring1, offspring2 = crossover(parent1, parent2)
-                    else: # If the random number generated is higher than the probability of doing crossover, this won't happen and the offsprings will be equal to the parents
-                        offspring1, offspring2 = parent1_, parent2_
-
-                    # Mutation will happen with the probability of mut_p (and if the counter is less than 20)
-                    if random.random() < mut_p and counter < 20:
-                        offspring1 = mutate(offspring1)
-                    if random.random() < mut_p and counter < 20:
-                        offspring2 = mutate(offspring2)
-
-                    # Verify if the offsprings generated verify the macros. If so, this while will stop, otherwise, it will enter again the loop
-                    # and other offsprings will be created. Additionally, if the counter is equal or higher than 20, the while loop will also stop.
-                    # If we didn't add this constraint, the algorithm could be stuck here, trying to create new offsprings that satisfied the macros.
-                    if (self.verify_macros(offspring1)[0] and self.verify_macros(offspring2)[0]) or counter >= 20:
-                        break
-
-                    counter += 1
-                    if counter%5 == 0:
-                        print(counter)
-
-                # If the offspring is in the form of a list, which corresponds to its representation, we will append to the new_pop an instance of the class Individual,
-                # which creates a new individual
-                if isinstance(offspring1, list):
-                    new_pop.append(Individual(representation=offspring1))
-                else: # If the offspring is not in the form of a list, it is because it is already an instance of the Individual class, thus we just add it to the new population
-                    new_pop.append(offspring1)
-
-                # This if condition exists because if we have an odd number of offsprings, it may happen that only one offspring can enter the population, otherwise we would
-                # have a higher number of individuals in it than what we intend to. Thus, only if the size of the new_pop is lower than the size that we want, the offspring2 will be added to
-                # the new population
-                if len(new_pop) < self.size:
-                    if isinstance(offspring2, list):
-                        new_pop.append(Individual(representation=offspring2))
-                    else:
-                        new_pop.append(offspring2)
-            # If we are applying Elitism, the variable worst will save the worst individual in the population, depending on the type of optimization problem
-            if elitism:
+                if fitness_sharing is True:
+                    fitness_sharing = exact_sharing
+                # The shared fitness is only used to select the parents. If the population is changed in place, the individuals that survive must be compared
+                # with the offsprings by their real fitness, so it is kept in raw_fitnesses.
+                raw_fitnesses = self.get_fitnesses()
+                self.set_fitnesses(fitness_sharing(self))
+            timer.lap("sharing")
+
+            # The next step is to populate the new population. Each pair of parents generates 2 offsprings, so we need half as many pairs as the number of offsprings
+            n_pairs = (offspring_size + 1) // 2
+
+            # Select, from the population we have, the 2 individuals that will be the parents of each pair. We only keep the positions (rows) of the parents
+            # in the population, instead of copies of them.
+            parents1, parents2 = self.select_parents(select, n_pairs, replacement)
+            if fitness_sharing and schedule != "generational":
+                self.set_fitnesses(raw_fitnesses)
+
+            # Get the representations of both parents, as the rows of 2 matrices (only the rows of the parents are gathered, not the whole population).
+            # The offsprings of each pair start as copies of their parents
+            parents1_ = self.get_rows(parents1)
+            parents2_ = self.get_rows(parents2)
+            offsprings1 = parents1_.copy()
+            offsprings2 = parents2_.copy()
+
+            # Preallocate the buffer where the batched mutations write the mutated offsprings
+            mutation_buffer = np.empty_like(offsprings1)
+            timer.lap("selection")
+
+            # The pending array contains the pairs that still didn't generate offsprings that reach the macros. Initially, all of them are pending.
+            # Initialize a counter to 0 that will count how many times the algorithm tries to create offsprings that do not reach the macros.
+            # If this counter gets to 20, the offsprings of the pairs that are still pending will simply become the same as their parents.
+            # If repair is True, the offsprings are only created once, and the ones that don't reach the macros are repaired afterwards.
+            pending = np.arange(n_pairs)
+            counter = 0
+            max_tries = 1 if self.repair else 20
+            # Fitness and feasibility of the offsprings, saved when they are evaluated inside the loop, so they are not evaluated again afterwards
+            fitness1, fitness2 = np.empty(n_pairs), np.empty(n_pairs)
+            feasible1, feasible2 = np.empty(n_pairs, dtype=bool), np.empty(n_pairs, dtype=bool)
+            while pending.size > 0 and counter < max_tries:
+                # Crossover will happen, for each pending pair, with the probability of xo_p
+                offsprings1[pending], offsprings2[pending] = self.apply_crossover(crossover, parents1_[pending], parents2_[pending], xo_p)
+                timer.lap("crossover")
+
+                # Mutation will happen, for each offspring of the pending pairs, with the probability of mut_p
+                offsprings1[pending] = self.apply_mutation(mutate, offsprings1[pending], mut_p, mutation_buffer)
+                offsprings2[pending] = self.apply_mutation(mutate, offsprings2[pending], mut_p, mutation_buffer)
+
+                # Keep the amounts of the foods inside the bounds of the problem
+                offsprings1[pending] = self.problem.clip(offsprings1[pending])
+                offsprings2[pending] = self.problem.clip(offsprings2[pending])
+                timer.lap("mutation")
+
+                # Verify, for all the pending pairs at once, if the offsprings generated verify the macros. The pairs in which both offsprings verify them
+                # stop being pending, while the others will go through the loop again and other offsprings will be created.
+                # If we didn't limit the counter, the algorithm could be stuck here, trying to create new offsprings that satisfied the macros.
+                fitness1[pending], feasible1[pending] = self.evaluate(offsprings1[pending])
+                fitness2[pending], feasible2[pending] = self.evaluate(offsprings2[pending])
+                pending = pending[~(feasible1[pending] & feasible2[pending])]
+                timer.lap("feasibility")
+
+                counter += 1
+                # Count the retries, i.e. the times the loop is repeated because there are pairs whose offsprings don't reach the macros
+                if counter > 1:
+                    timer.current['retries'] += 1
+
+            # The pairs that are still pending after 20 tries will have offsprings equal to their parents (so only they are evaluated again)
+            if not self.repair and pending.size > 0:
+                offsprings1[pending] = parents1_[pending]
+                offsprings2[pending] = parents2_[pending]
+                fitness1[pending], feasible1[pending] = self.evaluate(offsprings1[pending])
+                fitness2[pending], feasible2[pending] = self.evaluate(offsprings2[pending])
+
+            # Join the offsprings of all pairs (offspring1 and offspring2 of the first pair, then of the second pair, and so on). If we have an odd number of offsprings,
+            # only one offspring of the last pair can enter the population, otherwise we would have a higher number of individuals in it than what we intend to.
+            offsprings = np.empty((2 * n_pairs, offsprings1.shape[1]))
+            offsprings[0::2] = offsprings1
+            offsprings[1::2] = offsprings2
+            offsprings = offsprings[:offspring_size]
+            fitness = np.empty(2 * n_pairs)
+            fitness[0::2], fitness[1::2] = fitness1, fitness2
+            fitness = fitness[:offspring_size]
+            feasible = np.empty(2 * n_pairs, dtype=bool)
+            feasible[0::2], feasible[1::2] = feasible1, feasible2
+            feasible = feasible[:offspring_size]
+            timer.lap("bookkeeping")
+
+            # Repair the offsprings that don't reach the macros (only the repaired ones are evaluated again)
+            if self.repair:
+                self.repairs_per_gen.append(self.repair_infeasible(offsprings, fitness, feasible))
+            timer.lap("feasibility")
+
+            # If we are applying Elitism, the variable worst will save the position of the worst individual in the new population, depending on the type of optimization problem
+            if elitism and schedule == "generational":
                 if self.optim == "max":
-                    worst = min(new_pop, key=attrgetter("fitness"))
+                    worst = int(np.argmin(fitness))
                 elif self.optim == "min":
-                    worst = max(new_pop, key=attrgetter("fitness"))
-                # Then, we will remove from new_pop the worst individual and add to it the best one (called elite)
-                new_pop.pop(new_pop.index(worst))
-                new_pop.append(elite)
-
-            # Assign to the individuals the individuals inside the new_pop
-            self.individuals = new_pop
+                    worst = int(np.argmax(fitness))
+                # Then, we will replace the worst individual by the best one (called elite)
+                offsprings[worst], fitness[worst] = elite
+            timer.lap("elitism")
+
+            # Assign to the population the individuals of the new generation
+            if schedule == "generational":
+                self.set_population(offsprings, fitness)
+            elif schedule == "steady_state":
+                self.replace_worst(offsprings, fitness)
+            else:
+                self.truncate(offsprings, fitness, combined_fitness)
 
-            # Define the best solution and print it, depending on the type of optimization problem
+            # The best solution is found in the fitness vector, so no Individual is created for the other individuals in the compact mode
             if self.optim == "max":
-                self.best_sol = {max(self.individuals, key=attrgetter("fitness"))}
+                self.best_sol = self.individual(int(np.argmax(self.get_fitnesses())))
             elif self.optim == "min":
-                self.best_sol = {min(self.individuals, key=attrgetter("fitness"))}
+                self.best_sol = self.individual(int(np.argmin(self.get_fitnesses())))
             else:
                 raise Exception("No optimization specified (min or max).")
 
-            print(f'Best individual: { self.best_sol }')
+            self.best_sol_per_gen.append(self.best_sol.fitness) # gets the best fitness from each generation
+            self.generations = gen + 1
+            timer.lap("bookkeeping")
+
+            # Call the callbacks (for example, to print the best individual) with the record of the generation
+            record = timer.end_generation(self)
+            for callback in callbacks:
+                callback(self, record)
+
+            # Stop the evolution if one of the termination criteria is met
+            if termination is not None:
+                reason = termination.check(self, gen + 1)
+                if reason is not None:
+                    self.stop_reason = reason
+                    break
+
+            if checkpoint is not None and (gen + 1) % checkpoint_every == 0:
+                self.save_checkpoint(checkpoint)
 
-            self.best_sol = self.best_sol.pop()
-            self.best_sol_per_gen.append(self.best_sol.get_fitness()) # gets the best fitness from each generation
+        timer.stop_profile()
+        if checkpoint is not None:
+            self.save_checkpoint(checkpoint, finished=True)
 
         self.best_fitness = {min(self.best_sol_per_gen)} # gets the best fitness from all generations
         self.best_sol_macros = self.best_sol.verify_macros()[1] # gets the amounts of nutrients of the best solution from all generations
 
+    # Define a function that returns the individual in the position k of the population. In the compact mode, it has a copy of the genome, instead of a view,
+    # because the rows of the genome matrix are overwritten when the population is changed in place.
+    def individual(self, k):
+        if not self.compact:
+            return self._individuals[k]
+        return Individual(representation=self.genomes[k].copy(), fitness=float(self.fitnesses[k]), index=k, problem=self.problem)
+
+    # Define a function that writes, in place, the genomes given (as the rows of a matrix) and their fitness values into the positions rows of the population.
+    # Only those rows are changed, so the cost is proportional to the number of rows, instead of the size of the population.
+    def replace_rows(self, rows, genomes, fitnesses):
+        self.selection_tables = {}
+        if self.compact:
+            self.genomes[rows] = genomes
+            self.fitnesses[rows] = fitnesses
+            # The views over the rows that were replaced already see the new genomes, so only their fitness changes
+            if self._views is not None:
+                for k, fit in zip(rows.tolist(), np.asarray(fitnesses).tolist()):
+                    self._views[k].fitness = fit
+        else:
+            self.fitnesses[rows] = fitnesses
+            for k, representation, fit in zip(rows.tolist(), np.asarray(genomes).tolist(), np.asarray(fitnesses).tolist()):
+                self._individuals[k] = Individual(representation=representation, fitness=fit, index=k, problem=self.problem)
+
+    # Steady-state replacement: the offsprings given replace the len(offsprings) worst individuals of the population, that are found with argpartition
+    # (without sorting the whole population)
+    def replace_worst(self, offsprings, fitnesses):
+        current = self.get_fitnesses()
+        k = len(fitnesses)
+        if self.optim == "max":
+            worst = np.argpartition(current, k - 1)[:k]
+        elif self.optim == "min":
+            worst = np.argpartition(current, len(current) - k)[len(current) - k:]
+        else:
+            raise Exception("No optimization specified (min or max).")
+
+        self.replace_rows(worst, offsprings, fitnesses)
+
+    # (mu + lambda) replacement: the best size individuals among the population (mu) and the offsprings given (lambda) survive. They are found with argpartition
+    # over the fitness of both (in the preallocated vector combined_fitness, if it is given). The surviving offsprings are written in the rows of the individuals
+    # of the population that didn't survive, so the individuals that survive stay in their rows.
+    def truncate(self, offsprings, fitnesses, combined_fitness=None):
+        mu, lam = self.size, len(fitnesses)
+        if combined_fitness is None:
+            combined_fitness = np.empty(mu + lam)
+        combined_fitness[:mu] = self.get_fitnesses()
+        combined_fitness[mu:] = fitnesses
+
+        # After the partition, the first mu positions are the survivors and the other lam positions are the individuals that are eliminated
+        if self.optim == "max":
+            order = np.argpartition(combined_fitness, lam - 1)[::-1]
+        elif self.optim == "min":
+            order = np.argpartition(combined_fitness, mu - 1)
+        else:
+            raise Exception("No optimization specified (min or max).")
+        survivors, eliminated = order[:mu], order[mu:]
+
+        new = survivors[survivors >= mu] - mu
+        replaced = eliminated[eliminated < mu]
+        self.replace_rows(replaced, offsprings[new], fitnesses[new])
+
+    # Define a function that saves the state of the population in the file path (see checkpoint.py)
+    def save_checkpoint(self, path, finished=False):
+        save_checkpoint(self, path, finished)
+
+    # Define a function that creates a population from the checkpoint saved in path. The problem (and cache) are not saved in the checkpoint, so they must be the
+    # same ones given to the population that saved it (by default, the Stigler's diet problem). The next call of evolve continues the evolution that saved it.
+    @classmethod
+    def resume(cls, path, problem=None, cache=None):
+        checkpoint = load_checkpoint(path)
+        population = cls.__new__(cls)
+
+        population.problem = problem if problem is not None else Problem.default()
+        if cache is not None:
+            population.problem = population.problem.variant(cache=cache)
+        if checkpoint['genomes'].shape[1] != population.problem.num_genes:
+            raise ValueError(f"The checkpoint has {checkpoint['genomes'].shape[1]} genes, but the problem has {population.problem.num_genes} foods.")
+
+        population.rng = checkpoint['rng']
+        population.size = checkpoint['size']
+        population.optim = checkpoint['optim']
+        population.compact = checkpoint['compact']
+        population.dtype = np.dtype(checkpoint['dtype']).type
+        population.repair = checkpoint['repair']
+        population.evaluations = checkpoint['evaluations']
+        population.repairs = checkpoint['repairs']
+        population.generations = checkpoint['generations']
+        population.stop_reason = checkpoint['stop_reason']
+        population.finished = checkpoint['finished']
+        population.best_sol_per_gen = checkpoint['best_sol_per_gen'].tolist()
+        population.repairs_per_gen = checkpoint['repairs_per_gen'].tolist()
+        population.best_sol_macros = []
+        population._individuals = []
+        population._views = None
+        population.selection_tables = {}
+        population.set_population(checkpoint['genomes'], checkpoint['fitnesses'])
+
+        best_index = int(checkpoint['best_index'])
+        population.best_sol = population.individuals[best_index] if best_index >= 0 else None
+        population.resumed = True
+
+        return population
+
+    # Define a function that returns the statistics of the cache of the problem (hits, misses, hit rate and size), or None if it doesn't have one
+    def cache_stats(self):
+        if self.problem.cache is None:
+            return None
+        return self.problem.cache.stats()
+
+    # Define a function that returns the optimality gap of the best solution, i.e. how much more expensive (in relative terms) it is than the exact solution of
+    # the problem, given by its linear program (see lp.py)
+    def optimality_gap(self):
+        return optimality_gap(self.best_sol.get_fitness(), self.problem.lp()['fitness'])
+
+    # Define a function that returns a summary of the last evolve: why it stopped, after how many generations and evaluations, and the best fitness found
+    def get_stop_report(self):
+        return {
+            'stop_reason': self.stop_reason,
+            'generations': self.generations,
+            'evaluations': self.evaluations,
+            'best_fitness': min(self.best_sol_per_gen) if self.optim == "min" else max(self.best_sol_per_gen),
+        }
+
+    # Define a function that returns copies of the genomes and fitness values of the best m individuals, that will migrate to another population (island model)
+    def emigrants(self, m):
+        fitnesses = self.get_fitnesses()
+        m = min(m, len(fitnesses))
+        if self.optim == "max":
+            best = np.argpartition(-fitnesses, m - 1)[:m]
+        elif self.optim == "min":
+            best = np.argpartition(fitnesses, m - 1)[:m]
+        else:
+            raise Exception("No optimization specified (min or max).")
+
+        return self.get_genomes()[best].copy(), fitnesses[best].copy()
+
+    # Define a function that receives individuals from another population (their genomes and fitness values), that replace the worst individuals of this population
+    def immigrate(self, genomes, fitnesses):
+        population_genomes, population_fitnesses = self.get_genomes().copy(), self.get_fitnesses().copy()
+        m = min(len(genomes), len(population_fitnesses))
+        if self.optim == "max":
+            worst = np.argpartition(population_fitnesses, m - 1)[:m]
+        elif self.optim == "min":
+            worst = np.argpartition(-population_fitnesses, m - 1)[:m]
+        else:
+            raise Exception("No optimization specified (min or max).")
+
+        population_genomes[worst] = genomes[:m]
+        population_fitnesses[worst] = fitnesses[:m]
+        self.set_population(population_genomes, population_fitnesses)
+
     def get_best_representation(self):
         return self.best_sol.get_representation()
 
@@ -275,7 +699,9 @@ class Population:
         return self.best_sol
 
     def __len__(self):
-        return len(self.individuals)
+        if self.compact:
+            return len(self.genomes)
+        return len(self._individuals)
 
     def __getitem__(self, position):
         return self.individuals[position]
@@ -0,0 +1,60 @@
+import json
+import os
+from pathlib import Path
+import numpy as np
+
+# A checkpoint saves the whole state of a Population in the middle of (or after) evolve, so that a long run can be stopped and continued later, in the same
+# or another process, from the last generation saved (see Population.resume). It is a single .npz file (an uncompressed zip of .npy arrays, that is written
+# and read much faster than the Excel file with the results) with the genome matrix (with the type of the population), the fitness vector, the elite (the genome
+# and fitness of the best solution), the best fitness and number of repairs of each generation, the state of the random number generator (as JSON) and the
+# counters of the population. The file is written to a temporary file that is then renamed, so a checkpoint is never left partially written, even if the process
+# is killed while writing it, and the previous checkpoint is kept until the new one is complete.
+
+# Define a function that writes the checkpoint of the population to path. finished tells if the evolve that saved it had already finished.
+def save_checkpoint(population, path, finished=False):
+    path = Path(path)
+    best_index = population.best_sol.index if population.best_sol is not None else -1
+    genomes = population.get_genomes()
+    fitnesses = population.get_fitnesses()
+    arrays = {
+        'genomes': genomes,
+        'fitnesses': fitnesses,
+        'elite_genome': genomes[best_index] if best_index >= 0 else np.empty(0, dtype=genomes.dtype),
+        'elite_fitness': np.float64(fitnesses[best_index]) if best_index >= 0 else np.float64(np.nan),
+        'best_index': np.int64(best_index),
+        'best_sol_per_gen': np.asarray(population.best_sol_per_gen, dtype=np.float64),
+        'repairs_per_gen': np.asarray(population.repairs_per_gen, dtype=np.int64),
+        'rng_state': np.array(json.dumps(population.rng.bit_generator.state, default=lambda value: value.tolist())),
+        'metadata': np.array(json.dumps({
+            'size': population.size,
+            'optim': population.optim,
+            'compact': population.compact,
+            'dtype': np.dtype(population.dtype).name,
+            'repair': population.repair,
+            'generations': population.generations,
+            'evaluations': population.evaluations,
+            'repairs': population.repairs,
+            'stop_reason': population.stop_reason,
+            'finished': finished,
+        })),
+    }
+
+    tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    with open(tmp_path, "wb") as file:
+        np.savez(file, **arrays)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+# Define a function that reads the checkpoint in path, and returns a dictionary with its arrays and metadata, and the generator with the state that was saved
+def load_checkpoint(path):
+    with np.load(path) as data:
+        checkpoint = {name: data[name] for name in data.files}
+
+    checkpoint.update(json.loads(str(checkpoint.pop('metadata'))))
+    state = json.loads(str(checkpoint.pop('rng_state')))
+    bit_generator = getattr(np.random, state['bit_generator'])()
+    bit_generator.state = state
+    checkpoint['rng'] = np.random.Generator(bit_generator)
+
+    return checkpoint
@@ -1,61 +1,112 @@
-import random
-from random import randint, sample
-
-# Single Point crossover chooses one index in the parents and recombine their genes from that point, creating 2 offsprings.
-def single_point_co(p1, p2):
-    # Choose the crossover point, that is going to be a random integer number between 1 and the size of the parent minus 2
-    co_point = randint(1, len(p1)-2)
-
-    # The offspring1 will have the genes of the parent1 from the beginning until the crossover point, and it will have the genes of the
-    # parent 2 from that point until the end. For the offspring2, the reverse happens.
-    offspring1 = p1[:co_point] + p2[co_point:]
-    offspring2 = p2[:co_point] + p1[co_point:]
-
-    return offspring1, offspring2
-
-# In Multi Point crossover, the same as in Single Point crossover happens, but having more than one crossover point.
-def multi_point_co(p1, p2):
-    # Choose randomly the number of crossover points, that will be between 2 and 5
-    num_co_points = randint(2, 5)
-    # Choose randomly num_co_points numbers from 0 to the size of the parent1 minus 1, that will be the crossover points
-    co_points = sorted(sample(range(len(p1)), num_co_points))
-
-    # Initialize the offsprings
-    offspring1 = []
-    offspring2 = []
-
-    # Do a for loop that iterates over the number of crossover points plus one
-    for i in range(num_co_points + 1):
-        # Define the start and end indexes of the intervals, in which the change of genes will happen
-        start = co_points[i-1] if i > 0 else 0
-        end = co_points[i] if i < num_co_points else len(p1)
-
-        # If i is an even number, the genes are taken from p1 and added to offspring1, while the genes of p2 are added to offspring2.
-        # If i is an odd number, the opposite will happen. This addition of genes is done between intervals defined by the crossover points.
-        if i % 2 == 0:
-            offspring1.extend(p1[start:end])
-            offspring2.extend(p2[start:end])
-        else:
-            offspring1.extend(p2[start:end])
-            offspring2.extend(p1[start:end])
-
-    return offspring1, offspring2
-
-# The Uniform crossover recombines genes between 2 parents, by randomly selecting the genes either from one parent or the other, with equal probability
-def uniform_co(p1, p2):
-    # Initialize the offsprings
-    offspring1 = []
-    offspring2 = []
-
-    # gene1 corresponds to the genes in p1 and gene2 to the genes in p2
-    for gene1, gene2 in zip(p1, p2):
-        # If a randomly generated number is less than 0.5, the offspring1 will inherit the gene corresponding to the current index from p1 and the offspring2 from p2
-        if random.random() < 0.5:
-            offspring1.append(gene1)
-            offspring2.append(gene2)
-        # Otherwise, the offspring1 will inherit the gene corresponding to the current index from p2 and the offspring2 from p1
-        else:
-            offspring1.append(gene2)
-            offspring2.append(gene1)
-
-    return offspring1, offspring2
\ No newline at end of file
+import numpy as np
+from generators import get_rng, sample_indexes
+
+# All crossovers draw their random numbers from the Generator rng (see generators.py), or from the default generator if it is not given.
+
+# Single Point crossover chooses one index in the parents and recombine their genes from that point, creating 2 offsprings.
+def single_point_co(p1, p2, rng=None):
+    # Choose the crossover point, that is going to be a random integer number between 1 and the size of the parent minus 2
+    co_point = int(get_rng(rng).integers(1, len(p1) - 1))
+
+    # The offspring1 will have the genes of the parent1 from the beginning until the crossover point, and it will have the genes of the
+    # parent 2 from that point until the end. For the offspring2, the reverse happens.
+    offspring1 = p1[:co_point] + p2[co_point:]
+    offspring2 = p2[:co_point] + p1[co_point:]
+
+    return offspring1, offspring2
+
+# In Multi Point crossover, the same as in Single Point crossover happens, but having more than one crossover point.
+def multi_point_co(p1, p2, rng=None):
+    rng = get_rng(rng)
+    # Choose randomly the number of crossover points, that will be between 2 and 5
+    num_co_points = int(rng.integers(2, 6))
+    # Choose randomly num_co_points numbers from 0 to the size of the parent1 minus 1, that will be the crossover points
+    co_points = sorted(sample_indexes(rng, len(p1), num_co_points))
+
+    # Initialize the offsprings
+    offspring1 = []
+    offspring2 = []
+
+    # Do a for loop that iterates over the number of crossover points plus one
+    for i in range(num_co_points + 1):
+        # Define the start and end indexes of the intervals, in which the change of genes will happen
+        start = co_points[i-1] if i > 0 else 0
+        end = co_points[i] if i < num_co_points else len(p1)
+
+        # If i is an even number, the genes are taken from p1 and added to offspring1, while the genes of p2 are added to offspring2.
+        # If i is an odd number, the opposite will happen. This addition of genes is done between intervals defined by the crossover points.
+        if i % 2 == 0:
+            offspring1.extend(p1[start:end])
+            offspring2.extend(p2[start:end])
+        else:
+            offspring1.extend(p2[start:end])
+            offspring2.extend(p1[start:end])
+
+    return offspring1, offspring2
+
+# The Uniform crossover recombines genes between 2 parents, by randomly selecting the genes either from one parent or the other, with equal probability
+def uniform_co(p1, p2, rng=None):
+    # Draw the random numbers of all genes at once
+    draws = get_rng(rng).random(len(p1)).tolist()
+
+    # Initialize the offsprings
+    offspring1 = []
+    offspring2 = []
+
+    # gene1 corresponds to the genes in p1 and gene2 to the genes in p2
+    for gene1, gene2, draw in zip(p1, p2, draws):
+        # If a randomly generated number is less than 0.5, the offspring1 will inherit the gene corresponding to the current index from p1 and the offspring2 from p2
+        if draw < 0.5:
+            offspring1.append(gene1)
+            offspring2.append(gene2)
+        # Otherwise, the offspring1 will inherit the gene corresponding to the current index from p2 and the offspring2 from p1
+        else:
+            offspring1.append(gene2)
+            offspring2.append(gene1)
+
+    return offspring1, offspring2
+
+# The following crossover operators are batched versions of the ones above. Instead of a single pair of parents, they receive 2 (P x genes) matrices,
+# where the row k of each matrix corresponds to one of the parents of the pair k, and return 2 matrices with the offsprings of all pairs.
+# Instead of building the offsprings gene by gene, they build a boolean mask that tells, for each pair and gene, if the offspring1 inherits the gene from
+# the parent1 (and the offspring2 from the parent2) or the opposite, and apply it to all pairs with a single NumPy call.
+# The pairwise functions above remain available as a reference, and Population.evolve knows it can give these ones a whole batch by their attribute batched.
+
+# Batched Single Point crossover
+def batch_single_point_co(p1, p2, rng=None):
+    n_pairs, size = p1.shape
+    # Choose the crossover point of each pair, that is going to be a random integer number between 1 and the size of the parent minus 2
+    co_points = get_rng(rng).integers(1, size - 1, size=n_pairs)
+    # The genes before the crossover point are inherited from the same parent, and the ones from that point until the end are inherited from the other parent
+    mask = np.arange(size) < co_points[:, np.newaxis]
+
+    return np.where(mask, p1, p2), np.where(mask, p2, p1)
+
+batch_single_point_co.batched = True
+
+# Batched Multi Point crossover
+def batch_multi_point_co(p1, p2, rng=None):
+    rng = get_rng(rng)
+    n_pairs, size = p1.shape
+    # Choose randomly the number of crossover points of each pair, that will be between 2 and 5
+    num_co_points = rng.integers(2, 6, size=n_pairs)
+    # Choose randomly num_co_points different positions in each row, that will be the crossover points: we rank random numbers in each row and keep the positions
+    # with the lowest ranks
+    ranks = np.argsort(np.argsort(rng.random((n_pairs, size)), axis=1), axis=1)
+    co_points = ranks < num_co_points[:, np.newaxis]
+    # The interval of each gene is the number of crossover points up to its position. In the even intervals, the genes are inherited from the same parent,
+    # and in the odd intervals from the other one.
+    mask = np.cumsum(co_points, axis=1) % 2 == 0
+
+    return np.where(mask, p1, p2), np.where(mask, p2, p1)
+
+batch_multi_point_co.batched = True
+
+# Batched Uniform crossover
+def batch_uniform_co(p1, p2, rng=None):
+    # Each gene is inherited from one parent or the other with equal probability
+    mask = get_rng(rng).random(p1.shape) < 0.5
+
+    return np.where(mask, p1, p2), np.where(mask, p2, p1)
+
+batch_uniform_co.batched = True
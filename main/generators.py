@@ -0,0 +1,31 @@
+import numpy as np
+
+# All the random numbers of the Genetic Algorithm are drawn from NumPy random Generators, that are given explicitly to the operators and to the Population
+# (by the argument rng), instead of the global random modules. A run that is given a seed always draws the same numbers, and the independent runs of a sweep
+# (or the islands of the island model) are given generators created from SeedSequence.spawn, so their streams are never correlated, and the results don't
+# depend on the number of processes. When no generator is given, the operators use the default generator of this module, that is seeded with fresh entropy.
+default_generator = np.random.default_rng()
+
+# Define a function that returns a Generator from rng: a Generator is returned as it is, a seed (an int or a SeedSequence) creates a new Generator, and None
+# returns the default generator
+def get_rng(rng=None):
+    if rng is None:
+        return default_generator
+    return np.random.default_rng(rng)
+
+# Define a function that returns n independent seeds (SeedSequences) spawned from seed, for example one for each run of a sweep
+def spawn_seeds(seed, n):
+    return np.random.SeedSequence(seed).spawn(n)
+
+# Define a function that draws k different random integers between 0 and n - 1 (like random.sample(range(n), k)), for the operators that draw a few indexes per
+# call. Drawing k floats at once and rejecting the draws with repeated integers is several times faster than Generator.choice(n, k, replace=False) for small k,
+# but when k is close to n most draws would be rejected, so choice is used instead.
+def sample_indexes(rng, n, k):
+    if k > n:
+        raise ValueError(f"Cannot sample {k} different indexes from {n}.")
+    if 4 * k > n:
+        return rng.choice(n, k, replace=False).tolist()
+    while True:
+        indexes = (rng.random(k) * n).astype(np.intp).tolist()
+        if len(set(indexes)) == k:
+            return indexes
@@ -0,0 +1,98 @@
+import cProfile
+import csv
+import io
+import json
+import pstats
+import time
+
+# Phases of a generation of Population.evolve, whose time is measured separately
+PHASES = ["sharing", "selection", "crossover", "mutation", "feasibility", "elitism", "bookkeeping"]
+
+# An Instrumentation records, for each generation of Population.evolve, the time spent in each phase (selection, crossover, mutation, feasibility checks and
+# repairs, fitness sharing, elitism and bookkeeping), the number of fitness evaluations, retries and repairs, and the best fitness. The records can be exported
+# as JSON or CSV. If profile is True, evolve is also run under cProfile, and profile_stats returns the functions where the time was spent.
+class Instrumentation:
+    def __init__(self, profile=False):
+        self.records = []
+        self.profiler = cProfile.Profile() if profile else None
+        self.current = None
+        self.last = None
+
+    # Define a function that starts the record of the generation number generation
+    def start_generation(self, generation, population):
+        self.current = {'generation': generation}
+        self.current.update({phase: 0.0 for phase in PHASES})
+        self.current['retries'] = 0
+        self.start_evaluations = population.evaluations
+        self.start_repairs = population.repairs
+        self.last = time.perf_counter()
+
+    # Define a function that adds the time since the last call (or since the start of the generation) to the phase given
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    # Define a function that ends the record of the current generation, adding the counters of the population, and returns it
+    def end_generation(self, population):
+        record = self.current
+        record['total'] = sum(record[phase] for phase in PHASES)
+        record['evaluations'] = population.evaluations - self.start_evaluations
+        record['repairs'] = population.repairs - self.start_repairs
+        record['best_fitness'] = population.best_sol.fitness
+        self.records.append(record)
+        self.current = None
+
+        return record
+
+    def start_profile(self):
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def stop_profile(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    # Define a function that returns the total of each phase and counter over all generations recorded
+    def totals(self):
+        keys = PHASES + ['total', 'evaluations', 'retries', 'repairs']
+        return {key: sum(record[key] for record in self.records) for key in keys}
+
+    # Define a function that returns the records (and their totals) as JSON, and writes them to the file in path, if it is given
+    def to_json(self, path=None):
+        text = json.dumps({'generations': self.records, 'totals': self.totals()}, indent=2)
+        if path is not None:
+            with open(path, "w") as file:
+                file.write(text)
+        return text
+
+    # Define a function that returns the records as CSV (one row per generation), and writes them to the file in path, if it is given
+    def to_csv(self, path=None):
+        columns = ['generation'] + PHASES + ['total', 'evaluations', 'retries', 'repairs', 'best_fitness']
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(self.records)
+        if path is not None:
+            with open(path, "w", newline="") as file:
+                file.write(output.getvalue())
+        return output.getvalue()
+
+    # Define a function that returns the statistics of cProfile, sorted by sort, with the limit functions where the most time was spent
+    def profile_stats(self, sort="cumulative", limit=20):
+        if self.profiler is None:
+            return None
+        output = io.StringIO()
+        pstats.Stats(self.profiler, stream=output).sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+# Callbacks are functions that evolve calls at the end of each generation, with the population and the record of the generation. The default one prints the
+# best individual, as evolve always did.
+def print_best(population, record):
+    print(f'Best individual: { {population.best_sol} }')
+
+# Callback that prints a line with the generation, best fitness and time of each phase
+def print_timings(population, record):
+    phases = ", ".join(f"{phase} {record[phase] * 1000:.2f}ms" for phase in PHASES)
+    print(f"Generation {record['generation']}: best fitness {record['best_fitness']:.4f}, evaluations {record['evaluations']}, retries {record['retries']}, "
+          f"repairs {record['repairs']}, {phases}")
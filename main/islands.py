@@ -0,0 +1,121 @@
+import multiprocessing as mp
+import queue
+import traceback
+import numpy as np
+from charles import Population
+from generators import spawn_seeds
+
+# In the island model, instead of a single population, several independent populations (islands) evolve at the same time, each one in its own process.
+# Every migration_interval generations, each island sends copies of its best individuals (migrants) to another island, where they replace the worst ones.
+# The islands explore different regions of the search space, which keeps the diversity without the cost of Fitness Sharing, and the work is split by the cores.
+# The destinations of the migrants are given by the topology: in the "ring" topology, the island i always sends them to the island i + 1, and in the
+# "random" topology, a new random permutation of the islands (without any island sending to itself) is drawn for each migration.
+
+# Define a function that returns, for each island, the island to which it sends its migrants in the migration number epoch
+def destinations(n_islands, epoch, topology, seed):
+    if topology == "ring":
+        return [(island + 1) % n_islands for island in range(n_islands)]
+    elif topology == "random":
+        # All islands draw the same permutation, because they use the same seed and epoch
+        rng = np.random.default_rng([seed, epoch])
+        while True:
+            permutation = rng.permutation(n_islands)
+            if n_islands < 2 or np.all(permutation != np.arange(n_islands)):
+                return permutation.tolist()
+    else:
+        raise ValueError("The topology must be ring or random.")
+
+# Define the function executed by the process of each island. If the island fails, the error is sent to the main process (as its traceback, since not all
+# exceptions can be pickled), which stops all islands, instead of waiting forever for the result of the island that failed.
+def island_worker(island, inboxes, results, *args):
+    try:
+        results.put(("result", island, *evolve_island(island, inboxes, *args)))
+    except BaseException:
+        results.put(("error", island, traceback.format_exc()))
+
+# Define the function that evolves the island number island, and returns its best solution, best fitness, best fitness per generation and number of repairs
+def evolve_island(island, inboxes, n_islands, epochs, migration_interval, migrants, topology, seed, island_seed, population_kwargs, evolve_kwargs):
+    # The island draws all its random numbers from its own generator, created from the seed spawned for it
+    population = Population(**{**population_kwargs, 'rng': island_seed})
+    best_sol_per_gen = []
+    # Messages of later migrations that arrived before the one that the island is waiting for
+    early = {}
+
+    for epoch in range(epochs):
+        population.evolve(gens=migration_interval, **evolve_kwargs)
+        best_sol_per_gen.extend(population.get_best_sol_per_gen())
+
+        # There is no migration after the last epoch
+        if epoch == epochs - 1 or n_islands < 2:
+            break
+
+        # Send the migrants to the destination island, and receive the migrants sent to this island in the same migration
+        destination = destinations(n_islands, epoch, topology, seed)[island]
+        inboxes[destination].put((epoch, *population.emigrants(migrants)))
+        while epoch not in early:
+            message_epoch, genomes, fitnesses = inboxes[island].get()
+            early[message_epoch] = (genomes, fitnesses)
+        population.immigrate(*early.pop(epoch))
+
+    best = population.get_best_sol()
+    return np.asarray(best.get_representation(), dtype=np.float64), best.fitness, best_sol_per_gen, population.repairs
+
+# Define a function that stops the processes of all islands
+def stop_islands(processes):
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join()
+
+# Create a function that runs the island model, with n_islands populations created with population_kwargs (the arguments of Population), that evolve with
+# evolve_kwargs (the arguments of Population.evolve, except gens) for epochs x migration_interval generations, exchanging migrants individuals after every
+# migration_interval generations. Each island has its own seed, spawned from seed. It returns a dictionary with the best solution found by all islands, and the
+# best solution, best fitness per generation and number of repairs of each island.
+# The main process checks every poll_interval seconds if the processes of the islands are still alive.
+def run_islands(n_islands, epochs, migration_interval, migrants, population_kwargs, evolve_kwargs, topology="ring", seed=None, poll_interval=1.0):
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1)[0])
+    island_seeds = spawn_seeds(seed, n_islands)
+
+    inboxes = [mp.Queue() for _ in range(n_islands)]
+    results = mp.Queue()
+    processes = [
+        mp.Process(target=island_worker, args=(island, inboxes, results, n_islands, epochs, migration_interval, migrants, topology, seed, island_seeds[island],
+                                               population_kwargs, evolve_kwargs))
+        for island in range(n_islands)
+    ]
+    for process in processes:
+        process.start()
+
+    # The results are read before joining the processes, so that no process is blocked writing to the queue. If an island fails, or its process dies without
+    # sending its result (for example, if it is killed), the other islands are stopped (they would wait forever for its migrants) and the error is raised.
+    islands = {}
+    while len(islands) < n_islands:
+        try:
+            message = results.get(timeout=poll_interval)
+        except queue.Empty:
+            dead = [island for island, process in enumerate(processes) if process.exitcode not in (None, 0) and island not in islands]
+            if dead:
+                stop_islands(processes)
+                raise RuntimeError(f"The process of the island {dead[0]} died with the exit code {processes[dead[0]].exitcode}.")
+            continue
+
+        if message[0] == "error":
+            stop_islands(processes)
+            raise RuntimeError(f"The island {message[1]} failed:\n{message[2]}")
+        _, island, representation, fitness, best_sol_per_gen, repairs = message
+        islands[island] = {'best_sol': representation, 'best_fitness': fitness, 'best_sol_per_gen': best_sol_per_gen, 'repairs': repairs}
+    for process in processes:
+        process.join()
+
+    optim = population_kwargs.get("optim", "min")
+    choose = min if optim == "min" else max
+    best_island = choose(islands, key=lambda island: islands[island]['best_fitness'])
+
+    return {
+        'best_sol': islands[best_island]['best_sol'],
+        'best_fitness': islands[best_island]['best_fitness'],
+        'best_island': best_island,
+        'islands': [islands[island] for island in range(n_islands)],
+    }
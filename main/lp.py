@@ -0,0 +1,39 @@
+import numpy as np
+from generators import get_rng
+
+# The Stigler's diet problem is a linear program: minimize the price of the diet (prices @ x) subject to the amount of each nutrient reaching its target
+# (x @ nutrient_matrix >= targets), with the amount of each food between its lower and upper bounds. Thus, its exact optimum can be found with the simplex
+# method (scipy's linprog, with the HiGHS solver), in milliseconds. The optimum is used as a baseline, to know how far the best solution found by the Genetic
+# Algorithm is from the best possible one (the optimality gap), and it can also be given to the initial population, together with random perturbations of it.
+
+# Define a function that solves the linear program of the problem given, and returns a dictionary with the optimal genome (x), its price (fitness) and the
+# status of the solver
+def solve_lp(problem):
+    from scipy.optimize import linprog
+
+    upper = [None if np.isinf(bound) else bound for bound in problem.upper.tolist()]
+    # linprog only accepts constraints of the type A @ x <= b, so the constraints x @ nutrient_matrix >= targets are multiplied by -1
+    result = linprog(problem.prices, A_ub=-problem.nutrient_matrix.T, b_ub=-problem.targets, bounds=list(zip(problem.lower.tolist(), upper)), method="highs")
+    if not result.success:
+        raise ValueError(f"The linear program of the diet problem has no solution: {result.message}")
+
+    return {'x': result.x, 'fitness': float(result.fun), 'status': result.status, 'message': result.message}
+
+# Define a function that returns the optimality gap of a fitness value, i.e. how much higher (in relative terms) it is than the optimum of the linear program
+def optimality_gap(fitness, optimum):
+    return (fitness - optimum) / abs(optimum)
+
+# Define a function that returns n genomes (as the rows of a matrix) built from the optimum x of the linear program: the first one is the optimum itself, and
+# the others are perturbations of it, where the amount of each food is multiplied by a random factor between 1 - noise and 1 + noise, and some foods that are
+# not in the optimal diet (each one with the probability of noise) are added with a small amount. The genomes can be infeasible, so they should be repaired.
+def lp_seeds(problem, x, n, noise=0.2, rng=None):
+    rng = get_rng(rng)
+    seeds = np.tile(x, (n, 1))
+    if n > 1:
+        perturbed = seeds[1:]
+        perturbed *= rng.uniform(1 - noise, 1 + noise, perturbed.shape)
+        added = rng.random(perturbed.shape) < noise
+        scale = x[x > 0].mean() if np.any(x > 0) else 1.0
+        perturbed += np.where(added, rng.uniform(0, noise * scale, perturbed.shape), 0.0)
+
+    return problem.clip(seeds)
@@ -1,47 +1,132 @@
-import random
-from random import sample
-
-# Swap mutation swaps the positions of 2 random genes
-def swap_mutation(individual):
-    # Randomly select the 2 genes to mutate
-    mut_indexes = sample(range(0, len(individual)), 2)
-    # Swap the genes in the indexes selected
-    individual[mut_indexes[0]], individual[mut_indexes[1]] = individual[mut_indexes[1]], individual[mut_indexes[0]]
-
-    return individual
-
-# Inversion mutation inverts a subset of genes within an individual's representation
-def inversion_mutation(individual):
-    # Randomly select 2 indexes
-    mut_indexes = sample(range(0, len(individual)), 2)
-    # Sort them
-    mut_indexes.sort()
-    # The genes within the selected subset are reversed
-    individual[mut_indexes[0]:mut_indexes[1]] = individual[mut_indexes[0]:mut_indexes[1]][::-1]
-
-    return individual
-
-# Random mutation introduces random changes to the genes of an individual
-def random_mutation(individual, mutation_rate=0.1, mutation_range=0.5):
-    # Initialize the individual to be returned
-    mutated_individual = []
-
-    for gene in individual:
-        # The mutation will happen to each gene with a certain probability
-        if random.random() < mutation_rate:
-            # Generate a random mutation value (for the current gene), that is sampled between -0.5 and 0.5 (predefined values), with an uniform distribution
-            mutation = random.uniform(-mutation_range, mutation_range)
-            # Mutate the gene by adding to its value the value of the mutation
-            mutated_gene = gene + mutation
-            # Since in our problem, it doesn't make sense to have negative values, since we can't have a negative quantity of food, if the mutated_gene
-            # is negative, we will assign to it the value of 0
-            if mutated_gene < 0:
-                mutated_gene = 0
-            # Add to the mutated_individual the mutated genes
-            mutated_individual.append(mutated_gene)
-        else:
-            # If the gene isn't going to suffer any mutation, add it to the mutated_individual
-            mutated_individual.append(gene)
-
-    return mutated_individual
-
+import numpy as np
+from generators import get_rng, sample_indexes
+
+# All mutations draw their random numbers from the Generator rng (see generators.py), or from the default generator if it is not given.
+
+# Swap mutation swaps the positions of 2 random genes
+def swap_mutation(individual, rng=None):
+    # Work on a copy, so that the individual given (that can be a parent that is still in the population) is never changed
+    individual = list(individual)
+    # Randomly select the 2 genes to mutate
+    mut_indexes = sample_indexes(get_rng(rng), len(individual), 2)
+    # Swap the genes in the indexes selected
+    individual[mut_indexes[0]], individual[mut_indexes[1]] = individual[mut_indexes[1]], individual[mut_indexes[0]]
+
+    return individual
+
+# Inversion mutation inverts a subset of genes within an individual's representation
+def inversion_mutation(individual, rng=None):
+    # Work on a copy, so that the individual given (that can be a parent that is still in the population) is never changed
+    individual = list(individual)
+    # Randomly select 2 indexes
+    mut_indexes = sample_indexes(get_rng(rng), len(individual), 2)
+    # Sort them
+    mut_indexes.sort()
+    # The genes within the selected subset are reversed
+    individual[mut_indexes[0]:mut_indexes[1]] = individual[mut_indexes[0]:mut_indexes[1]][::-1]
+
+    return individual
+
+# Random mutation introduces random changes to the genes of an individual
+def random_mutation(individual, mutation_rate=0.1, mutation_range=0.5, rng=None):
+    rng = get_rng(rng)
+    # Initialize the individual to be returned
+    mutated_individual = []
+    # Draw the random numbers of all genes at once
+    draws = rng.random(len(individual)).tolist()
+    mutations = rng.uniform(-mutation_range, mutation_range, len(individual)).tolist()
+
+    for gene, draw, mutation in zip(individual, draws, mutations):
+        # The mutation will happen to each gene with a certain probability
+        if draw < mutation_rate:
+            # The random mutation value (for the current gene) is sampled between -0.5 and 0.5 (predefined values), with an uniform distribution
+            # Mutate the gene by adding to its value the value of the mutation
+            mutated_gene = gene + mutation
+            # Since in our problem, it doesn't make sense to have negative values, since we can't have a negative quantity of food, if the mutated_gene
+            # is negative, we will assign to it the value of 0
+            if mutated_gene < 0:
+                mutated_gene = 0
+            # Add to the mutated_individual the mutated genes
+            mutated_individual.append(mutated_gene)
+        else:
+            # If the gene isn't going to suffer any mutation, add it to the mutated_individual
+            mutated_individual.append(gene)
+
+    return mutated_individual
+
+
+# The following mutation operators are batched versions of the ones above. Instead of a single individual, they receive a (N x genes) matrix, where each row
+# is an offspring, and mutate all of them at once, with random indexes or masks drawn for each row. The mutated offsprings are written into the preallocated
+# buffer out (if it is given, otherwise a new matrix is created), so the matrix given is never changed and the offsprings never share memory with their parents.
+# Population.evolve knows it can give these ones a whole batch by their attribute batched.
+
+# Define a function that draws, for each of the n rows, 2 different random indexes between 0 and size - 1
+def random_index_pairs(n, size, rng=None):
+    rng = get_rng(rng)
+    first = rng.integers(0, size, size=n)
+    # The second index is drawn from the size - 1 remaining positions, so it is always different from the first one
+    second = rng.integers(0, size - 1, size=n)
+    second += second >= first
+
+    return first, second
+
+# Batched Swap mutation
+def batch_swap_mutation(offsprings, out=None, rng=None):
+    if out is None:
+        out = np.empty_like(offsprings)
+    np.copyto(out, offsprings)
+
+    # Randomly select, for each offspring, the 2 genes to mutate, and swap them
+    rows = np.arange(len(offsprings))
+    first, second = random_index_pairs(len(offsprings), offsprings.shape[1], rng)
+    out[rows, first] = offsprings[rows, second]
+    out[rows, second] = offsprings[rows, first]
+
+    return out
+
+batch_swap_mutation.batched = True
+
+# Batched Inversion mutation
+def batch_inversion_mutation(offsprings, out=None, rng=None):
+    if out is None:
+        out = np.empty_like(offsprings)
+
+    # Randomly select, for each offspring, 2 indexes and sort them
+    first, second = random_index_pairs(len(offsprings), offsprings.shape[1], rng)
+    start, end = np.minimum(first, second)[:, np.newaxis], np.maximum(first, second)[:, np.newaxis]
+
+    # The genes within the selected subset are reversed: the gene in the position j (start <= j < end) is taken from the position start + end - 1 - j,
+    # and the genes outside of it stay in the same position
+    positions = np.arange(offsprings.shape[1])
+    source = np.where((positions >= start) & (positions < end), start + end - 1 - positions, positions)
+    out[...] = np.take_along_axis(offsprings, source, axis=1)
+
+    return out
+
+batch_inversion_mutation.batched = True
+
+# Batched Random mutation. The mutation values can be sampled with an uniform distribution between -mutation_range and mutation_range (as in random_mutation),
+# or with a gaussian distribution with a standard deviation of mutation_range.
+def batch_random_mutation(offsprings, out=None, mutation_rate=0.1, mutation_range=0.5, distribution="uniform", rng=None):
+    rng = get_rng(rng)
+    if out is None:
+        out = np.empty_like(offsprings)
+
+    # The mutation will happen to each gene with a certain probability
+    mask = rng.random(offsprings.shape) < mutation_rate
+
+    if distribution == "uniform":
+        mutation = rng.uniform(-mutation_range, mutation_range, offsprings.shape)
+    elif distribution == "gaussian":
+        mutation = rng.normal(0, mutation_range, offsprings.shape)
+    else:
+        raise ValueError("The distribution must be uniform or gaussian.")
+
+    # Mutate the genes by adding to their values the values of the mutation. Since we can't have a negative quantity of food, the negative mutated genes become 0
+    np.add(offsprings, mutation, out=out, where=mask)
+    np.copyto(out, offsprings, where=~mask)
+    np.maximum(out, 0, out=out)
+
+    return out
+
+batch_random_mutation.batched = True
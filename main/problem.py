@@ -0,0 +1,114 @@
+import hashlib
+import numpy as np
+from repair import food_rankings, greedy_repair
+from lp import solve_lp
+
+# A Problem holds everything that defines an instance of the diet problem: the price of each food, the contribution of each food to each nutrient, the target
+# amounts of the nutrients and the bounds of the amount of each food. The Population and its Individuals evaluate and repair the diet plans with the Problem
+# they are given, instead of the global data of sdp_data, so one process can optimize several diet problems (for example, with regional price tables or different
+# nutrient targets) at the same time. A Problem is never changed after it is created: variant creates a new one, that shares the arrays that are not changed.
+# A Problem can also have an EvaluationCache (see cache.py), that saves the price and nutrients of the genomes it evaluates, for example variant(cache=EvaluationCache()).
+class Problem:
+    def __init__(self, prices, nutrient_matrix, targets, nutrient_names=None, food_names=None, lower=0.0, upper=np.inf, cache=None):
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.nutrient_matrix = np.asarray(nutrient_matrix, dtype=np.float64)
+        self.targets = np.asarray(targets, dtype=np.float64)
+
+        if self.nutrient_matrix.shape != (len(self.prices), len(self.targets)):
+            raise ValueError("The nutrient_matrix must have one row per food and one column per nutrient.")
+
+        self.nutrient_names = list(nutrient_names) if nutrient_names is not None else [f"Nutrient {j}" for j in range(len(self.targets))]
+        self.food_names = list(food_names) if food_names is not None else [f"Food {i}" for i in range(len(self.prices))]
+
+        # Lower and upper bounds of the amount of each food
+        self.lower = np.broadcast_to(np.asarray(lower, dtype=np.float64), self.prices.shape)
+        self.upper = np.broadcast_to(np.asarray(upper, dtype=np.float64), self.prices.shape)
+
+        # Foods sorted by their price per unit of each nutrient, used by the repair operator
+        self.rankings = food_rankings(self.prices, self.nutrient_matrix)
+
+        self.cache = cache
+        # Key of the problem in the cache: a digest of the data that defines the fitness and amounts of nutrients of a genome, so problems with different data
+        # never share the entries of a cache (and equal problems, like the variants with other bounds, do)
+        digest = hashlib.blake2b(digest_size=16)
+        for array in (self.prices, self.nutrient_matrix, self.targets):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        self.key = digest.digest()
+        # Solution of the linear program of the problem (see lp.py), that is only solved when it is used for the first time
+        self._lp = None
+
+    # The Problem of the Stigler's diet, with the data of sdp_data. It is created only once, when it is used for the first time.
+    _default = None
+
+    @classmethod
+    def default(cls):
+        if cls._default is None:
+            import sdp_data
+            cls._default = cls(sdp_data.prices, sdp_data.nutrient_matrix, sdp_data.macro_targets, nutrient_names=sdp_data.nutrient_names,
+                               food_names=sdp_data.snapshot()[0]['foods'])
+        return cls._default
+
+    # Define a function that returns a new Problem, equal to this one except for the arguments given (for example, variant(prices=regional_prices))
+    def variant(self, **changes):
+        arguments = {
+            'prices': self.prices,
+            'nutrient_matrix': self.nutrient_matrix,
+            'targets': self.targets,
+            'nutrient_names': self.nutrient_names,
+            'food_names': self.food_names,
+            'lower': self.lower,
+            'upper': self.upper,
+            'cache': None,
+        }
+        arguments.update(changes)
+        return Problem(**arguments)
+
+    @property
+    def num_genes(self):
+        return len(self.prices)
+
+    # Define a function that evaluates many genomes at once (the rows of a (N x genes) matrix), and returns the fitness (price of the diet plan) of each one and
+    # a mask that tells which ones satisfy the targets
+    def evaluate(self, genomes):
+        fitness, totals = self.fitness_and_totals(genomes)
+        feasible = np.all(totals >= self.targets, axis=1)
+
+        return fitness, feasible
+
+    # Define a function that returns the fitness and the amounts of each nutrient (as a matrix) of the genomes given, using the cache if the problem has one
+    def fitness_and_totals(self, genomes):
+        genomes = np.asarray(genomes, dtype=np.float64)
+        if self.cache is not None:
+            return self.cache.evaluate(genomes, self.compute_fitness_and_totals, len(self.targets), self.key)
+        return self.compute_fitness_and_totals(genomes)
+
+    def compute_fitness_and_totals(self, genomes):
+        return genomes @ self.prices, genomes @ self.nutrient_matrix
+
+    # Define a function that calculates the amounts of each nutrient present in a diet plan and verifies if the targets are being satisfied
+    def check(self, representation):
+        if self.cache is not None:
+            totals = self.fitness_and_totals([representation])[1][0]
+        else:
+            totals = np.dot(np.asarray(representation, dtype=np.float64), self.nutrient_matrix)
+        valid = bool(np.all(totals >= self.targets))
+
+        return valid, dict(zip(self.nutrient_names, totals.tolist()))
+
+    # Define a function that repairs the genomes given (see repair.py), respecting the upper bounds
+    def repair(self, genomes, margin=1e-9):
+        upper = self.upper if np.isfinite(self.upper).any() else None
+        return greedy_repair(genomes, self.prices, self.nutrient_matrix, self.targets, self.rankings, margin, upper)
+
+    # Define a function that returns the exact solution of the problem (see lp.py), solving its linear program on the first call
+    def lp(self):
+        if self._lp is None:
+            self._lp = solve_lp(self)
+        return self._lp
+
+    # Define a function that limits the genomes given to the bounds of the amount of each food, returning a new matrix
+    def clip(self, genomes):
+        return np.clip(genomes, self.lower, self.upper)
+
+    def __repr__(self):
+        return f"Problem(foods={len(self.prices)}, nutrients={len(self.targets)})"
@@ -0,0 +1,42 @@
+import numpy as np
+
+# The repair operator turns infeasible genomes (diet plans that don't reach the target_macros) into feasible ones, instead of throwing them away and generating
+# new ones. For each nutrient that is missing, it raises the amount of the food that gives that nutrient for the lowest price, just enough to reach the target
+# (if that food reaches its upper bound, the next cheapest food is raised, and so on). Since adding food never decreases the amount of any nutrient, after going
+# through all nutrients once every genome is feasible (unless the upper bounds make it impossible), so the repair takes a bounded time.
+
+# Define a function that returns, for each nutrient (column), the positions of the foods sorted by their price per unit of that nutrient, from the cheapest one.
+# The foods that don't have the nutrient are at the end.
+def food_rankings(prices, nutrient_matrix):
+    with np.errstate(divide="ignore"):
+        price_per_unit = np.where(nutrient_matrix > 0, prices[:, np.newaxis] / nutrient_matrix, np.inf)
+
+    return np.argsort(price_per_unit, axis=0, kind="stable")
+
+# Define a function that repairs the genomes given (as the rows of a matrix) and returns the repaired genomes. The genomes that are already feasible are not changed,
+# and the matrix given is never changed. rankings can be given with the result of food_rankings, to avoid calculating it on every call, and upper with the upper
+# bound of each gene.
+def greedy_repair(genomes, prices, nutrient_matrix, targets, rankings=None, margin=1e-9, upper=None):
+    if rankings is None:
+        rankings = food_rankings(prices, nutrient_matrix)
+
+    repaired = np.array(genomes, dtype=np.float64)
+    totals = repaired @ nutrient_matrix
+
+    for nutrient in range(len(targets)):
+        for food in rankings[:, nutrient]:
+            # Find the genomes in which the nutrient is missing. If there are none, or the remaining foods don't have the nutrient, go to the next nutrient
+            deficit = targets[nutrient] - totals[:, nutrient]
+            rows = np.flatnonzero(deficit > 0)
+            if rows.size == 0 or nutrient_matrix[food, nutrient] <= 0:
+                break
+
+            # Raise the amount of the cheapest food for this nutrient, just enough to cover the deficit (plus a small margin of the target, so that rounding errors
+            # don't leave the nutrient slightly below the target) or until its upper bound, and update the amounts of all nutrients given by that food
+            amount = (deficit[rows] + margin * targets[nutrient]) / nutrient_matrix[food, nutrient]
+            if upper is not None:
+                amount = np.clip(amount, 0, upper[food] - repaired[rows, food])
+            repaired[rows, food] += amount
+            totals[rows] += amount[:, np.newaxis] * nutrient_matrix[food]
+
+    return repaired
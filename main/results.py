@@ -0,0 +1,52 @@
+import json
+import os
+
+# The results of the runs are appended to a JSON Lines file (one JSON object per line) as soon as each run finishes, instead of being kept in memory until the
+# end of the sweep. Thus, the memory used doesn't grow with the number of runs, a crash only loses the runs that were still executing, and a sweep that is
+# started again skips the runs that are already in the file. At the end, the file is exported to an Excel sheet.
+class ResultsStore:
+    def __init__(self, path):
+        self.path = path
+
+    # Define a function that returns the records saved in the file. A line that is incomplete (because the process was killed while writing it) is ignored.
+    def load(self):
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path) as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass
+        return records
+
+    # Define a function that returns the keys (name of the combination, run number) of the runs that are already saved in the file
+    def completed(self):
+        return {(record['Config'], record['Run']) for record in self.load()}
+
+    # Define a function that appends a record to the file, and makes sure it is written to the disk before returning
+    def append(self, record):
+        line = json.dumps(record, default=float) + "\n"
+        # If the last line of the file is incomplete, the record starts in a new line, so that it is not joined to it
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, "rb") as file:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    line = "\n" + line
+        with open(self.path, "a") as file:
+            file.write(line)
+            file.flush()
+            os.fsync(file.fileno())
+
+    # Define a function that exports the records to a single sheet of an Excel file, with the columns given, in the order given by key
+    def to_excel(self, excel_path, columns, key=None, sheet_name='Combined'):
+        import pandas as pd
+
+        records = sorted(self.load(), key=key) if key is not None else self.load()
+        df = pd.DataFrame([{column: record[column] for column in columns} for record in records], columns=columns)
+
+        with pd.ExcelWriter(excel_path) as writer:
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+        return df
@@ -1,42 +1,73 @@
-import pandas as pd
+import argparse
+import os
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from copy import deepcopy
-from sdp_data import foods
+import sdp_data
 from charles import Population
 from selection import tournament, ranking, fps
 from mutation import swap_mutation, inversion_mutation, random_mutation
 from crossover import uniform_co, single_point_co, multi_point_co
 import itertools
+from results import ResultsStore
+from termination import Termination
+from cache import EvaluationCache
+from generators import spawn_seeds
 
-# Create a function that will run the algorithm, with the specified methods
+# Create a function that will run the algorithm once, with the specified methods, and return the row with the results of the run
+def run(test_name, run_number, selection, crossover, mutation, elitism, fitness_sharing, seed=None, termination=None, cache_size=None, lp_seeds=0, checkpoint=None):
+    # If cache_size is given, the genomes are evaluated through a cache with that size (see cache.py)
+    cache = EvaluationCache(cache_size) if cache_size else None
+    # If lp_seeds is given, that number of individuals of the initial population are the exact solution of the linear program and perturbations of it (see lp.py).
+    # Each run has its own seed (an int or a SeedSequence), from which the population creates the generator of all its random numbers (see generators.py), so that
+    # the runs are independent (and reproducible), even when they are executed in parallel
+    # If checkpoint is given, the state of the run is saved in that file after every generation, and if the file already exists, the run continues from it
+    if checkpoint is not None and os.path.exists(checkpoint):
+        pop_ = Population.resume(checkpoint, cache=cache)
+    else:
+        pop_ = Population(size=70, optim="min", sol_size=sdp_data.num_genes, valid_set=[0.1, 1], cache=cache, lp_seeds=lp_seeds, rng=seed)
+    pop_.evolve(gens=30, replacement=False, select=selection, crossover=crossover, mutate=mutation, xo_p=0.9, mut_p=0.2, elitism=elitism, fitness_sharing=fitness_sharing,
+                termination=termination, checkpoint=checkpoint)
+
+    final_representation = deepcopy(pop_.get_best_representation())
+
+    foods = sdp_data.foods
+    diet_plan = {}
+    # Create a for loop that will return the final diet plan, with the names of all foods, as well as its quatities, followed by the corresponding units
+    for i, q, u in zip(foods.index.tolist(), foods['quantity'].tolist(), foods['unit'].tolist()):
+        value = f"{final_representation.pop(0) * q} {u}"
+        diet_plan[i] = value
+    print('Final Diet Plan:', diet_plan)
+
+    # Return a filtered diet plan that only contains the foods that actually enter in the diet plan, i.e. have a quantity different from zero
+    filtered_diet_plan = {key: value for key, value in diet_plan.items() if not value.startswith('0.0')}
+    print('Final Filtered Diet Plan:', filtered_diet_plan)
+
+    # Create a row with information relating the run made, such as the best solution and best fitness value, to be inserted into an Excel sheet,
+    # in order to make it easier to analyse the results
+    return {
+        'Test': test_name if run_number == 1 else '',
+        'Run': run_number,
+        'Best_sol': pop_.get_best_representation(),
+        'Best_sol_per_gen': pop_.get_best_sol_per_gen(),
+        'Best_Fitness': min(pop_.best_fitness),
+        'Best_Diet': filtered_diet_plan,
+        'Macros': pop_.best_sol_macros,
+        'Repairs': pop_.repairs,
+        'Stop_reason': pop_.stop_reason,
+        'Generations': pop_.generations,
+        'Cache_hit_rate': cache.hit_rate() if cache is not None else None,
+        # Price of the exact solution of the problem, and how much more expensive (in relative terms) the best solution found is
+        'LP_optimum': pop_.problem.lp()['fitness'],
+        'Optimality_gap': pop_.optimality_gap()
+    }
+
+# Create a function that will run the algorithm 3 times, with the specified methods, and add the results to runs_data
 def start(runs_data, test_name, selection, crossover, mutation, elitism, fitness_sharing):
-    for run in range(3):
-        pop_ = Population(size=70, optim="min", sol_size=len(foods), valid_set=[0.1, 1])
-        pop_.evolve(gens=30, replacement=False, select=selection, crossover=crossover, mutate=mutation, xo_p=0.9, mut_p=0.2, elitism=elitism, fitness_sharing=fitness_sharing)
-
-        final_representation = deepcopy(pop_.get_best_representation())
-
-        diet_plan = {}
-        # Create a for loop that will return the final diet plan, with the names of all foods, as well as its quatities, followed by the corresponding units
-        for i, q, u in zip(foods.index.tolist(), foods['quantity'].tolist(), foods['unit'].tolist()):
-            value = f"{final_representation.pop(0) * q} {u}"
-            diet_plan[i] = value
-        print('Final Diet Plan:', diet_plan)
-
-        # Return a filtered diet plan that only contains the foods that actually enter in the diet plan, i.e. have a quantity different from zero
-        filtered_diet_plan = {key: value for key, value in diet_plan.items() if not value.startswith('0.0')}
-        print('Final Filtered Diet Plan:', filtered_diet_plan)
-
-        # Create a table with information relating the runs made, such as the best solution and best fitness value, to be inserted into an Excel sheet,
-        # in order to make it easier to analyse the results
-        run_number = run + 1
-        test_column_value = test_name if run_number == 1 else ''
-        runs_data['Test'].append(test_column_value)
-        runs_data['Run'].append(run_number)
-        runs_data['Best_sol'].append(pop_.get_best_representation())
-        runs_data['Best_sol_per_gen'].append(pop_.get_best_sol_per_gen())
-        runs_data['Best_Fitness'].append(pop_.best_fitness)
-        runs_data['Best_Diet'].append(filtered_diet_plan)
-        runs_data['Macros'].append(pop_.best_sol_macros)
+    for run_ in range(3):
+        row = run(test_name, run_ + 1, selection, crossover, mutation, elitism, fitness_sharing)
+        for column, value in row.items():
+            runs_data.setdefault(column, []).append(value)
 
     return runs_data
 
@@ -47,40 +78,86 @@ mutations = [swap_mutation, inversion_mutation, random_mutation]
 elitisms = [False, True]
 fitness_sharings = [False, True]
 
-selections_str = ['fps', 'tournament', 'ranking']
-crossovers_str = ['single_point_co', 'multi_point_co', 'uniform_co']
-mutations_str = ['swap_mutation', 'inversion_mutation', 'random_mutation']
-elitisms_ = [False, True]
-fitness_sharings_ = [True]
-
 # Iterate over the previously created lists, and save all possible combinations into 'combinations'
 combinations = list(itertools.product(selections, crossovers, mutations, elitisms, fitness_sharings))
-combinations_str = list(itertools.product(selections_str, crossovers_str, mutations_str, elitisms_, fitness_sharings_))
-
-# Initialize the columns to be inserted into the Excel sheet
-runs_data = {
-    'Test': [],
-    'Run': [],
-    'Best_sol': [],
-    'Best_sol_per_gen': [],
-    'Best_Fitness': [],
-    'Best_Diet': [],
-    'Macros': []
-}
-
-# Iterate over the combinations and apply the Genetic Algorithm created, with all different possible combinations of methods
-for i, combination in enumerate(combinations):
-    name = str(combinations[i])
+
+# Define a function that returns the name of a combination, with the names of its methods
+def combination_name(combination):
     selection, crossover, mutation, elitism, fitness_sharing = combination
-    print('---> ', name)
-    runs_data = start(runs_data, name, selection, crossover, mutation, elitism, fitness_sharing)
-    print(runs_data['Macros'][i])
-df = pd.DataFrame(runs_data)
-
-# Write the DataFrame in a single sheet
-with pd.ExcelWriter('results_final.xlsx') as writer:
-    sheet_name = 'Combined'
-    df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-    # Save the Excel file
-    writer.save()
+    return str((selection.__name__, crossover.__name__, mutation.__name__, elitism, fitness_sharing))
+
+# Define the function executed by each worker process, that runs the run number run_number of the combination number config
+def run_task(config, run_number, seed, termination=None, cache_size=None, lp_seeds=0, checkpoint_dir=None):
+    combination = combinations[config]
+    checkpoint = checkpoint_path(checkpoint_dir, config, run_number) if checkpoint_dir is not None else None
+    return config, run_number, run(combination_name(combination), run_number, *combination, seed=seed, termination=termination, cache_size=cache_size, lp_seeds=lp_seeds,
+                                   checkpoint=checkpoint)
+
+# Define a function that returns the file where the run number run_number of the combination number config saves its checkpoints
+def checkpoint_path(checkpoint_dir, config, run_number):
+    return Path(checkpoint_dir) / f"config{config}_run{run_number}.npz"
+
+# Columns of the Excel sheet with the results
+columns = ['Test', 'Run', 'Best_sol', 'Best_sol_per_gen', 'Best_Fitness', 'Best_Diet', 'Macros', 'Repairs', 'Stop_reason', 'Generations', 'Cache_hit_rate', 'LP_optimum', 'Optimality_gap']
+
+# Create a function that runs all combinations, runs times each, in a pool of workers processes (by default, one per core), and saves the results in the
+# ResultsStore store. Each (combination, run) is an independent task, with its own seed spawned from the seed given, so the sweep is reproducible and its results
+# don't depend on the number of workers. The runs that are already saved in the store are skipped, so an interrupted sweep can be resumed.
+# If a Termination is given, each run can stop before the 30 generations (see termination.py), and if cache_size is given, each run uses an EvaluationCache.
+# If lp_seeds is given, each initial population includes that number of individuals built from the exact solution of the linear program (see lp.py).
+# If checkpoint_dir is given, each run saves a checkpoint in that directory after every generation (see checkpoint.py), so the runs that were interrupted continue
+# from their last generation. The checkpoint of a run is deleted when its result is saved in the store.
+def run_grid(store, workers=None, runs=3, seed=None, termination=None, cache_size=None, lp_seeds=0, checkpoint_dir=None):
+    if checkpoint_dir is not None:
+        Path(checkpoint_dir).mkdir(parents=True, exist_ok=True)
+    tasks = [(config, run_number) for config in range(len(combinations)) for run_number in range(1, runs + 1)]
+    seeds = spawn_seeds(seed, len(tasks))
+
+    completed = store.completed()
+    pending = [(task, task_seed) for task, task_seed in zip(tasks, seeds) if (combination_name(combinations[task[0]]), task[1]) not in completed]
+    print(f'---> {len(tasks) - len(pending)}/{len(tasks)} runs already completed')
+
+    # Save the result of each task as soon as it is completed
+    finished = len(tasks) - len(pending)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_task, config, run_number, task_seed, termination, cache_size, lp_seeds, checkpoint_dir) for (config, run_number), task_seed in pending]
+        for future in as_completed(futures):
+            config, run_number, row = future.result()
+            store.append({'Config': combination_name(combinations[config]), 'Index': config, **row})
+            if checkpoint_dir is not None:
+                checkpoint_path(checkpoint_dir, config, run_number).unlink(missing_ok=True)
+            finished += 1
+            print(f'---> Finished {finished}/{len(tasks)}:', combination_name(combinations[config]), 'run', run_number)
+
+    return store
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Genetic Algorithm for the Stigler's diet problem with all combinations of methods.")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (by default, the number of cores)")
+    parser.add_argument("--runs", type=int, default=3, help="number of runs of each combination")
+    parser.add_argument("--seed", type=int, default=None, help="seed from which the seeds of all runs are spawned")
+    parser.add_argument("--results", default="results_final.jsonl", help="JSON Lines file where the result of each run is saved when it finishes (delete it to start the sweep again)")
+    parser.add_argument("--output", default="results_final.xlsx", help="Excel file where the results are exported at the end")
+    parser.add_argument("--stagnation", type=int, default=None, help="stop a run after this number of generations without improving the best fitness")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="minimum relative improvement of the best fitness that counts for --stagnation")
+    parser.add_argument("--time-budget", type=float, default=None, help="maximum time (in seconds) of each run")
+    parser.add_argument("--max-evaluations", type=int, default=None, help="maximum number of fitness evaluations of each run")
+    parser.add_argument("--target", type=float, default=None, help="stop a run when the best fitness (price of the diet) reaches this value")
+    parser.add_argument("--cache", type=int, default=None, help="size of the cache of evaluated genomes of each run (by default, no cache)")
+    parser.add_argument("--lp-seeds", type=int, default=0, help="number of individuals of each initial population built from the exact solution of the linear program and its perturbations")
+    parser.add_argument("--checkpoints", default=None, help="directory where each run saves a checkpoint after every generation, to continue the interrupted runs")
+    args = parser.parse_args()
+
+    termination = None
+    if any(value is not None for value in (args.stagnation, args.time_budget, args.max_evaluations, args.target)):
+        termination = Termination(stagnation=args.stagnation, tolerance=args.tolerance, time_budget=args.time_budget, max_evaluations=args.max_evaluations, target=args.target)
+
+    # Iterate over the combinations and apply the Genetic Algorithm created, with all different possible combinations of methods
+    store = run_grid(ResultsStore(args.results), workers=args.workers, runs=args.runs, seed=args.seed, termination=termination, cache_size=args.cache, lp_seeds=args.lp_seeds,
+                     checkpoint_dir=args.checkpoints)
+
+    # Write the results in a single sheet of the Excel file, in the order of the combinations and runs
+    store.to_excel(args.output, columns, key=lambda record: (record['Index'], record['Run']))
+
+if __name__ == "__main__":
+    main()
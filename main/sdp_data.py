@@ -1,11 +1,15 @@
-import random
-import pandas as pd
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+from pathlib import Path
 
-foods = pd.read_excel("SDP_data.xlsx")
-foods.set_index("Commodity", inplace = True)
+# The spreadsheet with the data of the foods is next to this file, so the data can be loaded from any working directory
+DATA_PATH = Path(__file__).with_name("SDP_data.xlsx")
 
-# Define the number of genes (scaling factors)
-num_genes = len(foods)
+# Directory where the binary snapshots of the spreadsheet are saved
+CACHE_DIR = Path(__file__).with_name(".sdp_cache")
 
 # Define the target macronutrient ratio
 target_macros = {
@@ -20,4 +24,112 @@ target_macros = {
             'Vitamin C': 75
 }
 
+# The order of the nutrients is the order of the target_macros dictionary
+nutrient_names = list(target_macros.keys())
 
+# Reading the spreadsheet with pandas (and openpyxl) takes much longer than the rest of the program needs to start, and it would be done by every process and
+# every import. Thus, the spreadsheet is parsed only once, into a binary snapshot: a directory with the numeric columns, the price vector and the nutrient
+# matrix as .npy files, plus a small JSON file with the names of the foods, their units and the names and types of the columns. The name of the directory is
+# a hash of the contents of the spreadsheet (and of the nutrients used), so a snapshot is never used after the spreadsheet changes. The .npy files are opened
+# as memory-mapped, read-only arrays: they load in milliseconds, and processes that load the same snapshot share the pages of the matrix in memory.
+
+# Define a function that returns the hash that identifies the snapshot of the spreadsheet in path
+def snapshot_key(path=DATA_PATH):
+    digest = hashlib.sha256(Path(path).read_bytes())
+    digest.update(json.dumps(nutrient_names).encode())
+    return digest.hexdigest()[:16]
+
+# Define a function that parses the spreadsheet and writes its snapshot to the directory snapshot_dir. The snapshot is written to a temporary directory
+# that is then renamed, so other processes never see a snapshot that is only partially written.
+def write_snapshot(path, snapshot_dir):
+    import pandas as pd
+
+    foods = pd.read_excel(path)
+    foods.set_index("Commodity", inplace = True)
+
+    numeric_columns = [column for column in foods.columns if pd.api.types.is_numeric_dtype(foods[column])]
+    metadata = {
+        'source': str(path),
+        'foods': foods.index.tolist(),
+        'columns': foods.columns.tolist(),
+        'numeric_columns': numeric_columns,
+        'dtypes': {column: str(dtype) for column, dtype in foods.dtypes.items()},
+        'text': {column: [None if pd.isna(value) else value for value in foods[column]] for column in foods.columns if column not in numeric_columns},
+    }
+
+    # Price of each food in dollars (the prices in the table are in cents)
+    prices = foods['price'].to_numpy(dtype=np.float64) * 0.01
+    # Contribution of one unit of each food to each nutrient (foods x nutrients). The amounts of nutrients in the table correspond to 1 dollar, so we
+    # multiply them by the price of the food in dollars.
+    nutrient_matrix = prices[:, np.newaxis] * foods[nutrient_names].to_numpy(dtype=np.float64)
+
+    snapshot_dir = Path(snapshot_dir)
+    snapshot_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = snapshot_dir.with_name(f"{snapshot_dir.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+    np.save(tmp_dir / "table.npy", foods[numeric_columns].to_numpy(dtype=np.float64))
+    np.save(tmp_dir / "prices.npy", prices)
+    np.save(tmp_dir / "nutrient_matrix.npy", nutrient_matrix)
+    (tmp_dir / "meta.json").write_text(json.dumps(metadata))
+
+    try:
+        os.rename(tmp_dir, snapshot_dir)
+    except OSError:
+        # Another process wrote the same snapshot in the meantime
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+# Define a function that loads the snapshot of the spreadsheet in path (creating it, if it doesn't exist yet), and returns its metadata and arrays
+def load_snapshot(path=DATA_PATH, cache_dir=CACHE_DIR):
+    snapshot_dir = Path(cache_dir) / snapshot_key(path)
+    if not (snapshot_dir / "meta.json").exists():
+        write_snapshot(path, snapshot_dir)
+
+    metadata = json.loads((snapshot_dir / "meta.json").read_text())
+    arrays = {name: np.load(snapshot_dir / f"{name}.npy", mmap_mode="r") for name in ("table", "prices", "nutrient_matrix")}
+
+    return metadata, arrays
+
+# Define a function that rebuilds the table of the foods (a DataFrame indexed by the Commodity, as read from the spreadsheet) from a snapshot
+def foods_from_snapshot(metadata, arrays):
+    import pandas as pd
+
+    foods = pd.DataFrame(np.asarray(arrays["table"]), columns=metadata['numeric_columns'], index=pd.Index(metadata['foods'], name="Commodity"))
+    for column, values in metadata['text'].items():
+        foods[column] = [np.nan if value is None else value for value in values]
+    foods = foods[metadata['columns']]
+
+    return foods.astype({column: dtype for column, dtype in metadata['dtypes'].items() if column in metadata['numeric_columns']})
+
+# The data is only loaded when it is used for the first time (and not when this module is imported), so importing the modules of the Genetic Algorithm
+# is fast and has no side effects. The attributes foods, num_genes, prices and nutrient_matrix of this module are created by __getattr__ on their first use,
+# and the table of the foods (that needs pandas) is only built if it is used.
+_snapshot = None
+
+# Define a function that returns the snapshot of the spreadsheet, loading it on the first call
+def snapshot():
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = load_snapshot()
+    return _snapshot
+
+def __getattr__(name):
+    if name == "foods":
+        value = foods_from_snapshot(*snapshot())
+    elif name == "num_genes":
+        # Define the number of genes (scaling factors)
+        value = len(snapshot()[0]['foods'])
+    elif name == "prices":
+        # Price of each food in dollars
+        value = snapshot()[1]["prices"]
+    elif name == "nutrient_matrix":
+        # Contribution of one unit of each food to each nutrient (foods x nutrients)
+        value = snapshot()[1]["nutrient_matrix"]
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value
+    return value
+
+# Target amounts of the nutrients, in the same order as the columns of the nutrient_matrix
+macro_targets = np.array([target_macros[nutrient] for nutrient in nutrient_names], dtype=np.float64)
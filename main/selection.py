@@ -1,70 +1,113 @@
-import random
-from operator import attrgetter
-from random import choice, sample, choices
-
-# In Fitness Proportionate selection, individuals with higher/lower fitness have a higher/lower probability of being selected, depending on the type of optimization problem.
-def fps(population):
-    if population.optim == "max":
-        # Sum total fitness
-        total_fitness = sum([i.fitness for i in population])
-        # Get a 'position' on the wheel
-        spin = random.uniform(0, total_fitness)
-        position = 0
-        # Find individual in the position of the spin
-        for individual in population:
-            position += individual.fitness
-            if position > spin:
-                return individual
-
-    elif population.optim == "min":
-        # Calculate total fitness
-        total_fitness = sum([1 / i.fitness for i in population]) # inverse because we want to give more chances to individuals with lower fitness values
-        # Get a 'position' on the wheel
-        spin = random.uniform(0, total_fitness)
-        position = 0
-        # Find individual in the position of the spin
-        for individual in population:
-            position += 1 / individual.fitness
-            if position > spin:
-                return individual
-
-    else:
-        raise Exception("No optimization specified (min or max).")
-
-# In Tournament selection, n random individuals are selected from the population and, from those, the one with the best fitness is selected.
-def tournament(population, size=4):
-    # Select randomly 4 individuals from the population
-    tournament = sample(population.individuals, size)
-
-    # From those individuals, return the one with the max/min fitness value, depending on the type of problem
-    if population.optim == "max":
-        return max(tournament, key=attrgetter("fitness"))
-    elif population.optim == "min":
-        return min(tournament, key=attrgetter("fitness"))
-    else:
-        raise Exception("No optimization specified (min or max).")
-
-# Ranking selection assigns selection probabilities based on the relative ranks of the individuals and chooses one.
-def ranking(population): # vai escolher um parent
-    # Sort the population by fitness, depending on the type of optimization problem
-    if population.optim == "max":
-        sorted_population = sorted(population.individuals, key = attrgetter("fitness"))
-    elif population.optim == "min":
-        sorted_population = sorted(population.individuals, key = attrgetter("fitness"), reverse = True)
-    else:
-        raise Exception("No optimization specified (min or max).")
-
-    # Calculate the sum of ranks from all individuals
-    sum_ranks = sum(range(1, len(sorted_population) + 1))
-
-    # Create a list that contains the probabilities of each individual being selected
-    selection_probabilities = []
-    for rank in range(1, len(sorted_population) + 1):
-        selection_probabilities.append(rank / sum_ranks)
-
-    # Select the individual to be returned based on the selection_probabilities
-    selected_indiv = choices(sorted_population, selection_probabilities, k=1)[0]
-
-    return selected_indiv
-
-
+import numpy as np
+from generators import sample_indexes
+
+# All selection methods draw their random numbers from the Generator rng (see generators.py) or, if it is not given, from the generator of the population.
+def selection_rng(population, rng):
+    return rng if rng is not None else population.rng
+
+# The selection methods below are called many times per generation (twice per pair of parents), but the population (and the fitness of its individuals)
+# only changes once per generation. Thus, the tables that they need (the fitness values, and the cumulative weights of the wheel used by fps and ranking)
+# are built only once per generation and saved in population.selection_tables, that the Population empties every time its individuals or their fitness change.
+def selection_table(population, name):
+    tables = population.selection_tables
+    if name not in tables:
+        if name == "fitness":
+            tables[name] = population.get_fitnesses()
+        elif name == "fps":
+            tables[name] = fps_table(population)
+        elif name == "ranking":
+            tables[name] = ranking_table(population)
+    return tables[name]
+
+# Define a function that draws n positions from a wheel, given by the cumulative weights of its slots
+def spin_wheel(cumulative_weights, n, rng):
+    # Get n 'positions' on the wheel, between 0 and the total weight, and find the slot of each one with a binary search
+    spins = rng.uniform(0, cumulative_weights[-1], n)
+    positions = np.searchsorted(cumulative_weights, spins, side="right")
+    # Avoids going beyond the last slot, due to rounding errors
+    return np.minimum(positions, len(cumulative_weights) - 1)
+
+# In Fitness Proportionate selection, individuals with higher/lower fitness have a higher/lower probability of being selected, depending on the type of optimization problem.
+def fps_table(population):
+    fitness = selection_table(population, "fitness")
+    if population.optim == "max":
+        # The weight of each individual in the wheel is its fitness
+        return np.cumsum(fitness)
+    elif population.optim == "min":
+        # The weight is the inverse of the fitness, because we want to give more chances to individuals with lower fitness values
+        return np.cumsum(1 / fitness)
+    else:
+        raise Exception("No optimization specified (min or max).")
+
+def fps(population, rng=None):
+    # Find individual in the position of the spin
+    return population[int(spin_wheel(selection_table(population, "fps"), 1, selection_rng(population, rng))[0])]
+
+# Batched Fitness Proportionate selection, that returns the positions in the population of n selected individuals
+def batch_fps(population, n, rng=None):
+    return spin_wheel(selection_table(population, "fps"), n, selection_rng(population, rng))
+
+batch_fps.batched = True
+
+# In Tournament selection, n random individuals are selected from the population and, from those, the one with the best fitness is selected.
+def tournament(population, size=4, rng=None):
+    fitness = selection_table(population, "fitness")
+    # Select randomly 4 individuals from the population
+    tournament = sample_indexes(selection_rng(population, rng), len(fitness), size)
+
+    # From those individuals, return the one with the max/min fitness value, depending on the type of problem
+    if population.optim == "max":
+        return population[max(tournament, key=fitness.__getitem__)]
+    elif population.optim == "min":
+        return population[min(tournament, key=fitness.__getitem__)]
+    else:
+        raise Exception("No optimization specified (min or max).")
+
+# Batched Tournament selection, that returns the positions in the population of n selected individuals. All tournaments are sampled at once, as a
+# (n x size) matrix of positions, where each row is a tournament. The individuals of each tournament are drawn with replacement, which for a population
+# much larger than the tournament size is almost the same as drawing them without replacement.
+def batch_tournament(population, n, size=4, rng=None):
+    fitness = selection_table(population, "fitness")
+    tournaments = selection_rng(population, rng).integers(0, len(fitness), size=(n, size))
+
+    # From each tournament, keep the individual with the max/min fitness value, depending on the type of problem
+    if population.optim == "max":
+        winners = np.argmax(fitness[tournaments], axis=1)
+    elif population.optim == "min":
+        winners = np.argmin(fitness[tournaments], axis=1)
+    else:
+        raise Exception("No optimization specified (min or max).")
+
+    return tournaments[np.arange(n), winners]
+
+batch_tournament.batched = True
+
+# Ranking selection assigns selection probabilities based on the relative ranks of the individuals and chooses one.
+def ranking_table(population):
+    fitness = selection_table(population, "fitness")
+    # Sort the population by fitness, depending on the type of optimization problem
+    if population.optim == "max":
+        sorted_population = np.argsort(fitness, kind="stable")
+    elif population.optim == "min":
+        sorted_population = np.argsort(-fitness, kind="stable")
+    else:
+        raise Exception("No optimization specified (min or max).")
+
+    # The weight of the individual in the position rank (starting in 1) of the sorted population is its rank, so its probability of being selected is
+    # the rank divided by the sum of ranks from all individuals
+    cumulative_ranks = np.cumsum(np.arange(1, len(sorted_population) + 1, dtype=np.float64))
+
+    return sorted_population, cumulative_ranks
+
+def ranking(population, rng=None): # vai escolher um parent
+    sorted_population, cumulative_ranks = selection_table(population, "ranking")
+
+    # Select the individual to be returned based on the selection probabilities
+    return population[int(sorted_population[spin_wheel(cumulative_ranks, 1, selection_rng(population, rng))[0]])]
+
+# Batched Ranking selection, that returns the positions in the population of n selected individuals
+def batch_ranking(population, n, rng=None):
+    sorted_population, cumulative_ranks = selection_table(population, "ranking")
+    return sorted_population[spin_wheel(cumulative_ranks, n, selection_rng(population, rng))]
+
+batch_ranking.batched = True
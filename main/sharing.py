@@ -0,0 +1,116 @@
+import numpy as np
+from generators import get_rng
+
+# Fitness Sharing divides the fitness of each individual by a sharing coefficient, that depends on the distances between that individual and the others, in order
+# to keep the diversity of the population. The functions below receive the population and return the vector with the shared fitness of all individuals, and can be
+# given to Population.evolve as its fitness_sharing parameter (fitness_sharing=True uses exact_sharing). They work on the genome matrix of the population, instead of
+# comparing the individuals pair by pair.
+
+# Define a function that calculates the Euclidean distances between the rows of genomes_a and the rows of genomes_b, as a (len(genomes_a) x len(genomes_b)) matrix.
+# It uses ||a - b||^2 = ||a||^2 + ||b||^2 - 2 a.b, so that the distances are obtained with a matrix product.
+def distance_matrix(genomes_a, genomes_b):
+    squared = np.sum(genomes_a ** 2, axis=1)[:, np.newaxis] + np.sum(genomes_b ** 2, axis=1)[np.newaxis, :] - 2 * genomes_a @ genomes_b.T
+    # Rounding errors can make the squared distance between equal genomes slightly negative
+    return np.sqrt(np.maximum(squared, 0))
+
+# Define a function that calculates the sharing coefficients from the distances between each individual (row) and others (columns), with the same rule as the
+# original implementation in Population.evolve: the distances of each individual are normalized between 0 and 1, and the sharing coefficient is their sum.
+# Since the sum of normalized distances is (sum - n * min) / (max - min), we only need the sum, min and max of each row, and never the normalized matrix.
+def coefficients_from_distances(distances, tolerance=1e-9):
+    total = np.nansum(distances, axis=1)
+    count = np.sum(~np.isnan(distances), axis=1)
+    min_distance = np.nanmin(distances, axis=1)
+    max_distance = np.nanmax(distances, axis=1)
+    spread = max_distance - min_distance
+
+    # If the max_distance is the same as the min_distance (up to rounding errors), all individuals are considered part of the same niche, and we skip applying
+    # the Fitness Sharing method to that individual, giving it a sharing coefficient of 1.
+    same = spread <= tolerance * np.maximum(max_distance, 1)
+    coefficients = np.ones(len(distances))
+    coefficients[~same] = (total[~same] - count[~same] * min_distance[~same]) / spread[~same]
+
+    return coefficients
+
+# Exact Fitness Sharing, that compares every individual with all the others. The distance matrix is calculated in blocks of chunk_size rows, so that the memory
+# used is bounded by chunk_size x size of the population, instead of the square of the size of the population.
+def exact_sharing(population, chunk_size=1024):
+    genomes = np.asarray(population.get_genomes(), dtype=np.float64)
+    fitness = population.get_fitnesses()
+    coefficients = np.empty(len(genomes))
+
+    for start in range(0, len(genomes), chunk_size):
+        end = min(start + chunk_size, len(genomes))
+        distances = distance_matrix(genomes[start:end], genomes)
+        # Ensures that we are only considering the distances between 2 different individuals
+        distances[np.arange(end - start), np.arange(start, end)] = np.nan
+        coefficients[start:end] = coefficients_from_distances(distances)
+
+    return fitness / coefficients
+
+# Approximate Fitness Sharing, that compares every individual with sample_size random partners, instead of all the others. The sum of the normalized distances
+# to the partners is then scaled to the size of the population, in order to estimate the sharing coefficient of the exact method. The cost is proportional to
+# the size of the population times sample_size, so it scales to populations of tens of thousands of individuals.
+def sampled_sharing(population, sample_size=64, chunk_size=1024):
+    genomes = np.asarray(population.get_genomes(), dtype=np.float64)
+    fitness = population.get_fitnesses()
+    size = len(genomes)
+    if size - 1 <= sample_size:
+        return exact_sharing(population, chunk_size)
+
+    coefficients = np.empty(size)
+    for start in range(0, size, chunk_size):
+        end = min(start + chunk_size, size)
+        rows = np.arange(start, end)
+        # Draw the partners of each individual among the other size - 1 individuals (the same partner may be drawn more than once)
+        partners = population.rng.integers(0, size - 1, size=(end - start, sample_size))
+        partners += partners >= rows[:, np.newaxis]
+        distances = np.linalg.norm(genomes[partners] - genomes[rows][:, np.newaxis, :], axis=2)
+        coefficients[start:end] = coefficients_from_distances(distances) * (size - 1) / sample_size
+
+    return fitness / coefficients
+
+# Define a function that estimates the niche radius sigma_share, such that each individual has, on average, about neighbours other individuals inside its niche.
+# It is the quantile neighbours / (size - 1) of the distances between sample_size random pairs of individuals.
+def niche_radius(genomes, neighbours=32, sample_size=4096, rng=None):
+    rng = get_rng(rng)
+    size = len(genomes)
+    if size < 2:
+        return 0.0
+    first = rng.integers(0, size, sample_size)
+    second = rng.integers(0, size - 1, sample_size)
+    second += second >= first
+    distances = np.linalg.norm(genomes[first] - genomes[second], axis=1)
+
+    return float(np.quantile(distances, min(1.0, neighbours / (size - 1))))
+
+# Niche Fitness Sharing, that uses the sharing function of Goldberg and Richardson: two individuals at a distance d lower than the niche radius sigma_share
+# share 1 - (d / sigma_share)^alpha of their fitness, and the niche count of an individual is the sum of what it shares with all individuals (including itself).
+# The pairs of individuals that are closer than sigma_share are found with a KD-tree (from scipy), so the cost depends on the number of neighbours instead of the
+# square of the size of the population (in many dimensions the KD-tree gets closer to comparing all pairs, and sampled_sharing is
+# the cheapest option). If sigma_share is not given, it is estimated with niche_radius. Crowded individuals are penalized: their fitness is divided (max) or multiplied (min) by their niche count.
+def niche_sharing(population, sigma_share=None, alpha=1, neighbours=32):
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        raise ImportError("niche_sharing requires scipy, use exact_sharing or sampled_sharing instead.")
+
+    genomes = np.asarray(population.get_genomes(), dtype=np.float64)
+    fitness = population.get_fitnesses()
+    if sigma_share is None:
+        sigma_share = niche_radius(genomes, neighbours, rng=population.rng)
+
+    niche_counts = np.ones(len(genomes))
+    if sigma_share > 0:
+        # Each pair (i, j) is found only once, and what they share is added to the niche counts of both. The pairs of the same individual are already counted
+        # in the initial value of 1.
+        pairs = cKDTree(genomes).query_pairs(sigma_share, output_type="ndarray")
+        shared = 1 - (np.linalg.norm(genomes[pairs[:, 0]] - genomes[pairs[:, 1]], axis=1) / sigma_share) ** alpha
+        np.add.at(niche_counts, pairs[:, 0], shared)
+        np.add.at(niche_counts, pairs[:, 1], shared)
+
+    if population.optim == "max":
+        return fitness / niche_counts
+    elif population.optim == "min":
+        return fitness * niche_counts
+    else:
+        raise Exception("No optimization specified (min or max).")
@@ -0,0 +1,46 @@
+import time
+
+# A Termination holds the criteria that stop Population.evolve before it runs all the generations it was given. Each criterion is only used if it is given:
+# - stagnation: number of generations without an improvement of the best fitness found (higher than tolerance, relative to that fitness);
+# - time_budget: maximum time (in seconds) spent by evolve;
+# - max_evaluations: maximum number of fitness evaluations done by evolve;
+# - target: fitness value that is good enough (for a min problem, a fitness lower or equal to it stops evolve; for a max problem, higher or equal).
+# After each generation, evolve calls check, that returns the reason to stop, or None if it should continue.
+class Termination:
+    def __init__(self, stagnation=None, tolerance=0.0, time_budget=None, max_evaluations=None, target=None):
+        self.stagnation = stagnation
+        self.tolerance = tolerance
+        self.time_budget = time_budget
+        self.max_evaluations = max_evaluations
+        self.target = target
+        self.start()
+
+    # Define a function that starts counting the time and the evaluations, called by evolve before the first generation
+    def start(self, evaluations=0):
+        self.start_time = time.perf_counter()
+        self.start_evaluations = evaluations
+        self.best = None
+        self.best_generation = 0
+
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    # Define a function that receives the population after the generation number generation (starting in 1) and returns the reason to stop, or None
+    def check(self, population, generation):
+        best = population.best_sol_per_gen[-1]
+        sign = 1 if population.optim == "min" else -1
+
+        # The best fitness found only counts as an improvement if it is better than the previous one by more than the tolerance (relative to the previous one)
+        if self.best is None or sign * (self.best - best) > self.tolerance * abs(self.best):
+            self.best = best
+            self.best_generation = generation
+
+        if self.target is not None and sign * (best - self.target) <= 0:
+            return "target"
+        if self.stagnation is not None and generation - self.best_generation >= self.stagnation:
+            return "stagnation"
+        if self.max_evaluations is not None and population.evaluations - self.start_evaluations >= self.max_evaluations:
+            return "max_evaluations"
+        if self.time_budget is not None and self.elapsed() >= self.time_budget:
+            return "time_budget"
+        return None